@@ -89,8 +89,7 @@ async def execute(chat_id: int, message: str, force_agent: Optional[str] = None,
     try:
         response = await providers.call_with_fallback(f"{primary_provider}/{primary_model}", messages, fallback)
         
-        await db.add_message(chat_id, "user", message)
-        await db.add_message(chat_id, "assistant", response)
+        await db.add_exchange(chat_id, message, response)
         
         return response
     except Exception as e:
@@ -110,6 +109,6 @@ async def summarize_with_llm(prompt: str) -> str:
         model = classifier_model
     
     try:
-        return await providers.call_provider(provider, model, messages)
+        return await providers.call_with_fallback(f"{provider}/{model}", messages, cache=True)
     except Exception as e:
         return f"Summary error: {str(e)}"
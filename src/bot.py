@@ -4,7 +4,8 @@ import asyncio
 from datetime import datetime
 from telegram import Update
 from telegram.ext import ApplicationBuilder, ContextTypes, MessageHandler, filters, CommandHandler
-from src import config, llm, search, scheduler, tasks, db, shortcuts, browser, notes, email_handler, github_handler, orchestrator
+from src import config, llm, search, scheduler, tasks, db, shortcuts, browser, notes, email_handler, github_handler, orchestrator, providers, intent, updates, chat_queue, outbox, formatter
+from src.turn import TurnContext
 
 START_TIME = time.time()
 
@@ -15,7 +16,7 @@ def check_access(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
         return
-    await context.bot.send_message(
+    await outbox.send_message(
         chat_id=update.effective_chat.id,
         text="Hello! I am PicoClaw 🦞, How may I assist today\n\nIf You need anything specific use /help"
     )
@@ -23,7 +24,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
         return
-    await context.bot.send_message(
+    await outbox.send_message(
         chat_id=update.effective_chat.id,
         text="Commands:\n"
              "/start - Introduction message\n"
@@ -64,29 +65,29 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     query = " ".join(context.args)
     if not query:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="Usage: /search <query>")
+        await outbox.send_message(chat_id=update.effective_chat.id, text="Usage: /search <query>")
         return
-    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+    await outbox.send_chat_action(chat_id=update.effective_chat.id, action="typing")
     result = await search.search_web(query)
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=result)
+    await outbox.send_reply(update.effective_chat.id, result)
 
 async def browse_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
         return
     url = " ".join(context.args)
     if not url:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="Usage: /browse <url>")
+        await outbox.send_message(chat_id=update.effective_chat.id, text="Usage: /browse <url>")
         return
-    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+    await outbox.send_chat_action(chat_id=update.effective_chat.id, action="typing")
     result = await browser.browse_url(url)
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=result)
+    await outbox.send_reply(update.effective_chat.id, result)
 
 async def remind_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
         return
     args = context.args
     if len(args) < 2:
-        await context.bot.send_message(
+        await outbox.send_message(
             chat_id=update.effective_chat.id, 
             text="Usage: /remind <time> <message>\nExamples: /remind 10m Call mom, /remind tomorrow 9am"
         )
@@ -95,16 +96,16 @@ async def remind_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message = " ".join(args[1:])
     remind_at = scheduler.parse_time(time_str)
     if not remind_at:
-        await context.bot.send_message(
+        await outbox.send_message(
             chat_id=update.effective_chat.id,
             text="Invalid time format. Use: 30s, 10m, 2h, tomorrow 9am, or 14:30"
         )
         return
     if remind_at <= datetime.now():
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="Time must be in the future.")
+        await outbox.send_message(chat_id=update.effective_chat.id, text="Time must be in the future.")
         return
     reminder_id = await scheduler.schedule_reminder(update.effective_chat.id, message, remind_at)
-    await context.bot.send_message(
+    await outbox.send_message(
         chat_id=update.effective_chat.id,
         text=f"Reminder set for {remind_at.strftime('%Y-%m-%d %H:%M')}. ID: {reminder_id}"
     )
@@ -114,7 +115,7 @@ async def reminders_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     reminders = await db.get_all_reminders(update.effective_chat.id)
     if not reminders:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="No active reminders.")
+        await outbox.send_message(chat_id=update.effective_chat.id, text="No active reminders.")
         return
     lines = ["Active reminders:"]
     for r in reminders:
@@ -122,67 +123,67 @@ async def reminders_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if isinstance(remind_at, str):
             remind_at = datetime.fromisoformat(remind_at)
         lines.append(f"• {r['id']}: {r['message']} at {remind_at.strftime('%Y-%m-%d %H:%M')}")
-    await context.bot.send_message(chat_id=update.effective_chat.id, text="\n".join(lines))
+    await outbox.send_message(chat_id=update.effective_chat.id, text="\n".join(lines))
 
 async def cancel_reminder_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
         return
     if not context.args:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="Usage: /cancelreminder <id>")
+        await outbox.send_message(chat_id=update.effective_chat.id, text="Usage: /cancelreminder <id>")
         return
     try:
         reminder_id = int(context.args[0])
     except ValueError:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="Invalid reminder ID.")
+        await outbox.send_message(chat_id=update.effective_chat.id, text="Invalid reminder ID.")
         return
     await db.delete_reminder(reminder_id)
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Reminder {reminder_id} cancelled.")
+    await outbox.send_message(chat_id=update.effective_chat.id, text=f"Reminder {reminder_id} cancelled.")
 
 async def note_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
         return
     content = " ".join(context.args)
     if not content:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="Usage: /note <text>")
+        await outbox.send_message(chat_id=update.effective_chat.id, text="Usage: /note <text>")
         return
     note_id = await notes.add_note(update.effective_chat.id, content)
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Note saved. ID: {note_id}")
+    await outbox.send_message(chat_id=update.effective_chat.id, text=f"Note saved. ID: {note_id}")
 
 async def notes_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
         return
     note_list = await notes.get_notes(update.effective_chat.id)
     if not note_list:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="No notes saved.")
+        await outbox.send_message(chat_id=update.effective_chat.id, text="No notes saved.")
         return
     lines = ["Your notes:"]
     for n in note_list:
         lines.append(f"• {n['id']}: {n['content'][:50]}...")
-    await context.bot.send_message(chat_id=update.effective_chat.id, text="\n".join(lines))
+    await outbox.send_message(chat_id=update.effective_chat.id, text="\n".join(lines))
 
 async def deletenote_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
         return
     if not context.args:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="Usage: /deletenote <id>")
+        await outbox.send_message(chat_id=update.effective_chat.id, text="Usage: /deletenote <id>")
         return
     try:
         note_id = int(context.args[0])
     except ValueError:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="Invalid note ID.")
+        await outbox.send_message(chat_id=update.effective_chat.id, text="Invalid note ID.")
         return
     await notes.delete_note(update.effective_chat.id, note_id)
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Note {note_id} deleted.")
+    await outbox.send_message(chat_id=update.effective_chat.id, text=f"Note {note_id} deleted.")
 
 async def run_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
         return
     command = " ".join(context.args)
     if not command:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="Usage: /run <command>")
+        await outbox.send_message(chat_id=update.effective_chat.id, text="Usage: /run <command>")
         return
     output, success = await tasks.run_command(update.effective_chat.id, command)
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"```\n{output}\n```", parse_mode="MarkdownV2")
+    await outbox.send_message(chat_id=update.effective_chat.id, text=f"```\n{formatter.escape_code(output)}\n```", parse_mode=formatter.PARSE_MODE)
 
 async def model_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
@@ -198,22 +199,22 @@ async def model_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             brain_config = config.BOT_CONFIG.get("brain", {})
             brain_model = f"{brain_config.get('provider', 'google')}/{brain_config.get('model', 'gemini-2.5-flash')}"
             current = f"auto (brain: {brain_model})"
-        await context.bot.send_message(chat_id=chat_id, text=f"Current model: {current}")
+        await outbox.send_message(chat_id=chat_id, text=f"Current model: {current}")
         return
     
     if args[0] == "reset":
         await db.update_session(chat_id, model_override=None)
-        await context.bot.send_message(chat_id=chat_id, text="Model override cleared.")
+        await outbox.send_message(chat_id=chat_id, text="Model override cleared.")
         return
     
     if args[0] == "list":
         models = config.get_all_models()
-        await context.bot.send_message(chat_id=chat_id, text="Available models:\n" + "\n".join(models))
+        await outbox.send_message(chat_id=chat_id, text="Available models:\n" + "\n".join(models))
         return
     
     model = args[0]
     await db.update_session(chat_id, model_override=model)
-    await context.bot.send_message(chat_id=chat_id, text=f"Model set to: {model}")
+    await outbox.send_message(chat_id=chat_id, text=f"Model set to: {model}")
 
 async def agent_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
@@ -224,21 +225,21 @@ async def agent_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not args:
         session = await db.get_session(chat_id)
         current = session.get("agent_override") or "auto (keyword routing)"
-        await context.bot.send_message(chat_id=chat_id, text=f"Current agent: {current}")
+        await outbox.send_message(chat_id=chat_id, text=f"Current agent: {current}")
         return
     
     if args[0] == "reset":
         await db.update_session(chat_id, agent_override=None)
-        await context.bot.send_message(chat_id=chat_id, text="Agent override cleared.")
+        await outbox.send_message(chat_id=chat_id, text="Agent override cleared.")
         return
     
     agent_name = args[0]
     if agent_name not in config.AGENTS:
-        await context.bot.send_message(chat_id=chat_id, text=f"Unknown agent. Available: {', '.join(config.AGENTS.keys())}")
+        await outbox.send_message(chat_id=chat_id, text=f"Unknown agent. Available: {', '.join(config.AGENTS.keys())}")
         return
     
     await db.update_session(chat_id, agent_override=agent_name)
-    await context.bot.send_message(chat_id=chat_id, text=f"Agent set to: {agent_name}")
+    await outbox.send_message(chat_id=chat_id, text=f"Agent set to: {agent_name}")
 
 async def shortcut_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
@@ -247,44 +248,44 @@ async def shortcut_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     
     if not args:
-        shortcut_list = await db.get_shortcuts(chat_id)
+        shortcut_list = await shortcuts.list_shortcuts(chat_id)
         if not shortcut_list:
-            await context.bot.send_message(chat_id=chat_id, text="No shortcuts. Usage: /shortcut add /gm 'Good morning'")
+            await outbox.send_message(chat_id=chat_id, text="No shortcuts. Usage: /shortcut add /gm 'Good morning'")
             return
         lines = ["Your shortcuts:"]
         for s in shortcut_list:
             lines.append(f"{s['trigger']} → {s['expansion'][:30]}...")
-        await context.bot.send_message(chat_id=chat_id, text="\n".join(lines))
+        await outbox.send_message(chat_id=chat_id, text="\n".join(lines))
         return
     
     if args[0] == "add":
         if len(args) < 3:
-            await context.bot.send_message(chat_id=chat_id, text="Usage: /shortcut add /gm 'Good morning, summarize my emails'")
+            await outbox.send_message(chat_id=chat_id, text="Usage: /shortcut add /gm 'Good morning, summarize my emails'")
             return
         trigger = args[1]
         expansion = " ".join(args[2:]).strip("'\"")
-        await db.add_shortcut(chat_id, trigger, expansion)
-        await context.bot.send_message(chat_id=chat_id, text=f"Shortcut added: {trigger}")
+        await shortcuts.add_shortcut(chat_id, trigger, expansion)
+        await outbox.send_message(chat_id=chat_id, text=f"Shortcut added: {trigger}")
         return
     
     if args[0] == "remove":
         trigger = args[1] if len(args) > 1 else ""
         if not trigger:
-            await context.bot.send_message(chat_id=chat_id, text="Usage: /shortcut remove /gm")
+            await outbox.send_message(chat_id=chat_id, text="Usage: /shortcut remove /gm")
             return
-        await db.delete_shortcut(chat_id, trigger)
-        await context.bot.send_message(chat_id=chat_id, text=f"Shortcut removed: {trigger}")
+        await shortcuts.remove_shortcut(chat_id, trigger)
+        await outbox.send_message(chat_id=chat_id, text=f"Shortcut removed: {trigger}")
         return
     
     if args[0] == "list":
-        shortcut_list = await db.get_shortcuts(chat_id)
+        shortcut_list = await shortcuts.list_shortcuts(chat_id)
         if not shortcut_list:
-            await context.bot.send_message(chat_id=chat_id, text="No shortcuts.")
+            await outbox.send_message(chat_id=chat_id, text="No shortcuts.")
             return
         lines = ["Your shortcuts:"]
         for s in shortcut_list:
             lines.append(f"{s['trigger']} → {s['expansion'][:30]}...")
-        await context.bot.send_message(chat_id=chat_id, text="\n".join(lines))
+        await outbox.send_message(chat_id=chat_id, text="\n".join(lines))
         return
 
 async def config_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -297,7 +298,7 @@ async def config_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "max_history": bot_config.get("max_history"),
         "commands_count": len(bot_config.get("commands", [])),
     }
-    await context.bot.send_message(
+    await outbox.send_message(
         chat_id=update.effective_chat.id,
         text=f"Bot config:\n{json.dumps(safe_config, indent=2)}"
     )
@@ -310,7 +311,7 @@ async def session_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if args and args[0] == "reset":
         await db.reset_session(chat_id)
-        await context.bot.send_message(chat_id=chat_id, text="Session reset.")
+        await outbox.send_message(chat_id=chat_id, text="Session reset.")
         return
     
     session = await db.get_session(chat_id)
@@ -320,13 +321,13 @@ async def session_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"Agent override: {session.get('agent_override') or 'none'}",
         f"Messages: {session.get('message_count', 0)}",
     ]
-    await context.bot.send_message(chat_id=chat_id, text="\n".join(lines))
+    await outbox.send_message(chat_id=chat_id, text="\n".join(lines))
 
 async def clear_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
         return
     await db.clear_conversation(update.effective_chat.id)
-    await context.bot.send_message(chat_id=update.effective_chat.id, text="Conversation cleared.")
+    await outbox.send_message(chat_id=update.effective_chat.id, text="Conversation cleared.")
 
 async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
@@ -335,31 +336,74 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     hours, remainder = divmod(uptime, 3600)
     minutes, seconds = divmod(remainder, 60)
     pending = await db.get_pending_reminders()
-    await context.bot.send_message(
-        chat_id=update.effective_chat.id,
-        text=f"Uptime: {hours}h {minutes}m {seconds}s\n"
-             f"Pending reminders: {len(pending)}\n"
-             f"Default model: {config.DEFAULT_MODEL}"
+    lines = [
+        f"Uptime: {hours}h {minutes}m {seconds}s",
+        f"Pending reminders: {len(pending)}",
+        f"Default model: {config.DEFAULT_MODEL}",
+    ]
+    update_stats = updates.get_stats()
+    lines.append(
+        f"Update queue: {update_stats['depth']} queued, {update_stats['workers']} workers, "
+        f"{update_stats['processed']} processed, {update_stats['duplicates']} duplicates dropped"
+    )
+    turn_stats = chat_queue.get_stats()
+    lines.append(
+        f"Turns: {turn_stats['active']} active, {turn_stats['queued']} queued, "
+        f"{turn_stats['merged'] + turn_stats['superseded']} merged"
     )
+    outbox_stats = outbox.get_stats()
+    lines.append(
+        f"Outbox: {outbox_stats['sent']} sent, {outbox_stats['coalesced']} status edits coalesced, "
+        f"{outbox_stats['retry_after']} flood waits"
+    )
+    pool_stats = db.get_pool_stats()
+    wait_p95 = f"{pool_stats['wait_p95_ms']}ms" if pool_stats["wait_p95_ms"] is not None else "n/a"
+    lines.append(
+        f"DB pool: {pool_stats['in_use']}/{pool_stats['max_size']} in use (peak {pool_stats['peak_in_use']}), "
+        f"{pool_stats['waiting']} waiting, wait p95 {wait_p95}, "
+        f"{pool_stats['exhausted']} exhausted, {pool_stats['timeouts']} timeouts, {pool_stats['retries']} retries"
+    )
+    maintenance = scheduler.get_maintenance_stats()
+    if maintenance["last_run"] is not None:
+        lines.append(
+            f"Maintenance: last run {maintenance['last_run']:%H:%M}, "
+            f"{sum(maintenance['last_purged'].values())} rows purged ({maintenance['purged']} total)"
+        )
+    health = providers.get_health_report()
+    if health:
+        lines.append("\nProviders:")
+        for h in health:
+            p95 = f"{h['p95']:.1f}s" if h["p95"] is not None else "n/a"
+            lines.append(f"• {h['endpoint']}: {h['state']} (health {h['health']}, errors {int(h['error_rate'] * 100)}%, p95 {p95})")
+    cache_stats = providers.response_cache.stats()
+    lines.append(f"Response cache: {cache_stats['entries']} entries, {int(cache_stats['hit_rate'] * 100)}% hit rate")
+    intent_stats = intent.get_stats()
+    if intent_stats["mode"] != "off":
+        lines.append(
+            f"Intent classifier: {intent_stats['mode']}, {intent_stats['samples']} samples, "
+            f"agreement {intent_stats['shadow_agree']}/{intent_stats['shadow_total']} "
+            f"(confident {intent_stats['confident_agree']}/{intent_stats['confident']})"
+        )
+    await outbox.send_message(chat_id=update.effective_chat.id, text="\n".join(lines))
 
 async def email_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
         return
     args = context.args
     if len(args) < 3:
-        await context.bot.send_message(chat_id=update.effective_chat.id, text="Usage: /email <to> <subject> <body>")
+        await outbox.send_message(chat_id=update.effective_chat.id, text="Usage: /email <to> <subject> <body>")
         return
     to = args[0]
     subject = args[1]
     body = " ".join(args[2:])
     result = await email_handler.send_email(to, subject, body)
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=result)
+    await outbox.send_message(chat_id=update.effective_chat.id, text=result)
 
 async def inbox_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
         return
     result = await email_handler.get_inbox()
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=result)
+    await outbox.send_message(chat_id=update.effective_chat.id, text=result)
 
 async def gh_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
@@ -367,7 +411,7 @@ async def gh_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     if not args:
         result = await github_handler.list_repos()
-        await context.bot.send_message(chat_id=update.effective_chat.id, text=result)
+        await outbox.send_message(chat_id=update.effective_chat.id, text=result)
         return
     
     action = args[0]
@@ -382,7 +426,7 @@ async def gh_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         result = "Usage: /gh repos | /gh issues <repo> | /gh commits <repo>"
     
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=result)
+    await outbox.send_message(chat_id=update.effective_chat.id, text=result)
 
 async def destroy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
@@ -391,14 +435,14 @@ async def destroy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
 
     try:
-        await context.bot.delete_message(chat_id=chat_id, message_id=update.message.message_id)
+        await outbox.delete_message(chat_id=chat_id, message_id=update.message.message_id)
     except Exception:
         pass
 
     args = context.args
 
     if len(args) < 2:
-        await context.bot.send_message(
+        await outbox.send_message(
             chat_id=chat_id,
             text="Usage: /destroy <0|1> <password>\n0 = wipe everything\n1 = wipe all except notes and reminders"
         )
@@ -408,14 +452,14 @@ async def destroy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     password = args[1]
 
     if mode not in ("0", "1"):
-        await context.bot.send_message(
+        await outbox.send_message(
             chat_id=chat_id,
             text="Usage: /destroy <0|1> <password>\n0 = wipe everything\n1 = wipe all except notes and reminders"
         )
         return
 
     if not config.DESTROY_PASSWORD or password != config.DESTROY_PASSWORD:
-        await context.bot.send_message(chat_id=chat_id, text="Incorrect password.")
+        await outbox.send_message(chat_id=chat_id, text="Incorrect password.")
         return
 
     attempt_count = await db.get_destroy_attempts(days=15)
@@ -425,7 +469,7 @@ async def destroy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         delta = next_available - now
         days_remaining = delta.days
         hours_remaining = delta.seconds // 3600
-        await context.bot.send_message(
+        await outbox.send_message(
             chat_id=chat_id,
             text=f"Rate limit reached. Next destroy available in {days_remaining}d {hours_remaining}h."
         )
@@ -433,13 +477,13 @@ async def destroy_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if mode == "0":
         wiped = await db.destroy_all()
-        await context.bot.send_message(
+        await outbox.send_message(
             chat_id=chat_id,
             text=f"🗑️ Destroy complete (mode 0)\nWiped: {', '.join(wiped)}"
         )
     else:
         wiped = await db.destroy_partial()
-        await context.bot.send_message(
+        await outbox.send_message(
             chat_id=chat_id,
             text=f"🗑️ Destroy complete (mode 1)\nWiped: {', '.join(wiped)}\nPreserved: notes, reminders, destroy_log"
         )
@@ -456,51 +500,46 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if text.startswith("/"):
         return
     
-    expanded = await shortcuts.expand_shortcut(update.effective_chat.id, text)
-    if expanded:
-        text = expanded
-    
     chat_id = update.effective_chat.id
-    status_msg = await context.bot.send_message(chat_id=chat_id, text="💭 Thinking...")
 
-    response = await orchestrator.execute(chat_id, text, bot=context.bot, status_message_id=status_msg.message_id)
+    async def run(texts):
+        await _run_text_turn(context, chat_id, texts)
 
-    if isinstance(response, list):
-        try:
-            await status_msg.delete()
-        except Exception:
-            pass
-        for part in response:
-            await context.bot.send_message(chat_id=chat_id, text=part, parse_mode="Markdown")
-    else:
-        try:
-            await context.bot.edit_message_text(
-                chat_id=chat_id,
-                message_id=status_msg.message_id,
-                text=response,
-                parse_mode="Markdown"
-            )
-        except Exception:
-            try:
-                await context.bot.edit_message_text(
-                    chat_id=chat_id,
-                    message_id=status_msg.message_id,
-                    text=response,
-                    parse_mode=None
-                )
-            except Exception:
-                try:
-                    await status_msg.delete()
-                except Exception:
-                    pass
-                await context.bot.send_message(chat_id=chat_id, text=response, parse_mode="Markdown")
+    chat_queue.submit(chat_id, text, run)
+
+async def _run_text_turn(context: ContextTypes.DEFAULT_TYPE, chat_id: int, texts):
+    expanded = [await shortcuts.expand_shortcut(chat_id, t) or t for t in texts]
+    text = "\n".join(expanded)
+    turn = await TurnContext.load(chat_id)
+    
+    status_msg = await outbox.send_message(chat_id=chat_id, text="💭 Thinking...")
+
+    try:
+        response = await orchestrator.execute(chat_id, text, bot=context.bot, status_message_id=status_msg.message_id, turn=turn)
+        chat_queue.mark_replying(chat_id)
+        await outbox.send_reply(chat_id, response, status_msg.message_id)
+    except asyncio.CancelledError:
+        turn.discard()
+        await _delete_quietly(status_msg)
+        raise
+    finally:
+        await turn.flush()
+
+async def _delete_quietly(message):
+    await outbox.delete_message(message.chat_id, message.message_id)
 
 async def voice_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
         return
     chat_id = update.effective_chat.id
-    
-    status_msg = await context.bot.send_message(chat_id=chat_id, text="🎙️ Transcribing...")
+
+    async def run(texts):
+        await _run_voice_turn(update, context, chat_id)
+
+    chat_queue.submit(chat_id, "[voice message]", run, mergeable=False)
+
+async def _run_voice_turn(update: Update, context: ContextTypes.DEFAULT_TYPE, chat_id: int):
+    status_msg = await outbox.send_message(chat_id=chat_id, text="🎙️ Transcribing...")
     
     try:
         voice = update.message.voice
@@ -508,36 +547,28 @@ async def voice_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         audio_bytes = await file.download_as_bytearray()
         audio_data = bytes(audio_bytes)
         
-        response = await orchestrator.execute(chat_id, "[voice message]", media={"type": "voice", "file": audio_data}, bot=context.bot, status_message_id=status_msg.message_id)
-        
-        if isinstance(response, list):
-            try:
-                await status_msg.delete()
-            except Exception:
-                pass
-            for part in response:
-                await context.bot.send_message(chat_id=chat_id, text=part, parse_mode="Markdown")
-        else:
-            try:
-                await context.bot.edit_message_text(chat_id=chat_id, message_id=status_msg.message_id, text=response, parse_mode="Markdown")
-            except Exception:
-                try:
-                    await context.bot.edit_message_text(chat_id=chat_id, message_id=status_msg.message_id, text=response, parse_mode=None)
-                except Exception:
-                    try:
-                        await status_msg.delete()
-                    except Exception:
-                        pass
-                    await context.bot.send_message(chat_id=chat_id, text=response, parse_mode="Markdown")
+        turn = await TurnContext.load(chat_id)
+        try:
+            response = await orchestrator.execute(chat_id, "[voice message]", media={"type": "voice", "file": audio_data}, bot=context.bot, status_message_id=status_msg.message_id, turn=turn)
+            await outbox.send_reply(chat_id, response, status_msg.message_id)
+        finally:
+            await turn.flush()
     except Exception as e:
-        await context.bot.send_message(chat_id=chat_id, text=f"Voice processing error: {str(e)}")
+        await outbox.send_message(chat_id=chat_id, text=f"Voice processing error: {str(e)}")
 
 async def photo_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not check_access(update, context):
         return
     chat_id = update.effective_chat.id
-    
-    status_msg = await context.bot.send_message(chat_id=chat_id, text="👁️ Analyzing image...")
+    caption = update.message.caption or "Describe this image"
+
+    async def run(texts):
+        await _run_photo_turn(update, context, chat_id, caption)
+
+    chat_queue.submit(chat_id, caption, run, mergeable=False)
+
+async def _run_photo_turn(update: Update, context: ContextTypes.DEFAULT_TYPE, chat_id: int, caption: str):
+    status_msg = await outbox.send_message(chat_id=chat_id, text="👁️ Analyzing image...")
     
     try:
         photo = update.message.photo[-1]
@@ -545,35 +576,17 @@ async def photo_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         image_bytes = await file.download_as_bytearray()
         image_data = bytes(image_bytes)
         
-        caption = update.message.caption or "Describe this image"
-        response = await orchestrator.execute(chat_id, caption, media={"type": "image", "file": image_data}, bot=context.bot, status_message_id=status_msg.message_id)
-        
-        if isinstance(response, list):
-            try:
-                await status_msg.delete()
-            except Exception:
-                pass
-            for part in response:
-                await context.bot.send_message(chat_id=chat_id, text=part, parse_mode="Markdown")
-        else:
-            try:
-                await context.bot.edit_message_text(chat_id=chat_id, message_id=status_msg.message_id, text=response, parse_mode="Markdown")
-            except Exception:
-                try:
-                    await context.bot.edit_message_text(chat_id=chat_id, message_id=status_msg.message_id, text=response, parse_mode=None)
-                except Exception:
-                    try:
-                        await status_msg.delete()
-                    except Exception:
-                        pass
-                    await context.bot.send_message(chat_id=chat_id, text=response, parse_mode="Markdown")
+        turn = await TurnContext.load(chat_id)
+        try:
+            response = await orchestrator.execute(chat_id, caption, media={"type": "image", "file": image_data}, bot=context.bot, status_message_id=status_msg.message_id, turn=turn)
+            await outbox.send_reply(chat_id, response, status_msg.message_id)
+        finally:
+            await turn.flush()
     except Exception as e:
-        await context.bot.send_message(chat_id=chat_id, text=f"Photo processing error: {str(e)}")
+        await outbox.send_message(chat_id=chat_id, text=f"Photo processing error: {str(e)}")
 
 async def send_reminder_message(chat_id: int, message: str):
-    from telegram import Bot
-    bot = Bot(token=config.TELEGRAM_BOT_TOKEN)
-    await bot.send_message(chat_id=chat_id, text=f"🔔 Reminder: {message}")
+    await outbox.queue_reminder(chat_id, message)
 
 def setup_bot():
     scheduler.set_reminder_callback(send_reminder_message)
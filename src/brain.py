@@ -1,7 +1,9 @@
 import json
 import logging
+import re
 from typing import Dict, Any, Optional, List
-from src import config, providers, db
+from src import config, providers, intent, turn as turn_context
+from src.turn import TurnContext
 
 logger = logging.getLogger(__name__)
 
@@ -59,8 +61,51 @@ You MUST respond with ONLY valid JSON, no other text:
 
 Now analyze this message and respond with ONLY JSON."""
 
-async def get_conversation_context(chat_id: int) -> str:
-    history = await db.get_conversation_history(chat_id)
+SINGLE_PASS_INSTRUCTIONS = """## Single-Pass Mode
+When action is answer_directly, "response" MUST contain the complete final answer for the user, written as PicoClaw and following the Telegram formatting rules. Never leave "response" null for answer_directly — there is no second call."""
+
+BRAIN_ACTIONS = [
+    "answer_directly", "search_and_answer", "search_only", "specialist", "multi_step",
+    "transcribe", "vision", "embeddings_search", "code_fim",
+]
+
+BRAIN_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "action": {"type": "STRING", "enum": BRAIN_ACTIONS},
+        "confidence": {"type": "STRING", "enum": ["high", "medium", "low"]},
+        "search_query": {"type": "STRING", "nullable": True},
+        "fetch_full_page": {"type": "BOOLEAN"},
+        "specialist": {"type": "STRING", "nullable": True},
+        "capability": {"type": "STRING"},
+        "reasoning": {"type": "STRING"},
+        "response": {"type": "STRING", "nullable": True},
+    },
+    "required": ["action", "confidence", "reasoning"],
+    "propertyOrdering": [
+        "action", "confidence", "search_query", "fetch_full_page",
+        "specialist", "capability", "reasoning", "response",
+    ],
+}
+
+JSON_OBJECT_PATTERN = re.compile(r"\{.*\}", re.DOTALL)
+RESPONSE_FIELD_PATTERN = re.compile(r'"response"\s*:\s*"((?:[^"\\]|\\.)*)')
+JSON_KEY_PATTERN = re.compile(r'"\w+"\s*:')
+SINGLE_PASS_FALLBACK = "Sorry, I couldn't put an answer together just now. Please try again."
+
+DEFAULT_DECISION = {
+    "action": "answer_directly",
+    "confidence": "high",
+    "search_query": None,
+    "fetch_full_page": False,
+    "specialist": None,
+    "capability": "chat",
+    "reasoning": "Failed to parse brain response, defaulting to direct answer",
+    "response": None
+}
+
+async def get_conversation_context(chat_id: int, turn: Optional[TurnContext] = None) -> str:
+    history = await turn_context.get_history(chat_id, turn)
     context_lines = []
     for msg in history[-10:]:
         role = msg.get("role", "user")
@@ -79,7 +124,19 @@ def _is_simple_message(message: str) -> bool:
     message_lower = message.lower()
     return not any(indicator in message_lower for indicator in complex_indicators)
 
-async def decide(chat_id: int, message: str, media: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+async def decide(chat_id: int, message: str, media: Optional[Dict[str, Any]] = None, turn: Optional[TurnContext] = None) -> Dict[str, Any]:
+    prediction = intent.predict(message) if not media else None
+    if intent.should_shortcut(prediction):
+        decision = prediction.to_decision(message)
+        logger.info(f"Brain skipped: {decision['reasoning']} -> {intent.label_for(decision)}")
+        return decision
+
+    decision = await _decide_with_llm(chat_id, message, media, turn)
+    if intent.enabled():
+        intent.record_shadow(message, prediction, decision)
+    return decision
+
+async def _decide_with_llm(chat_id: int, message: str, media: Optional[Dict[str, Any]] = None, turn: Optional[TurnContext] = None) -> Dict[str, Any]:
     brain_config = config.BOT_CONFIG.get("brain", {})
 
     if _is_simple_message(message) and not media:
@@ -88,6 +145,7 @@ async def decide(chat_id: int, message: str, media: Optional[Dict[str, Any]] = N
         fallback = [
             "openrouter/mistralai/mistral-7b-instruct:free"
         ]
+        tier = "fast"
         logger.info(f"Brain (fast tier): provider={provider_name}, model={model_name}")
     else:
         provider_name = brain_config.get("provider", "google")
@@ -96,9 +154,13 @@ async def decide(chat_id: int, message: str, media: Optional[Dict[str, Any]] = N
             "groq/llama-3.3-70b-versatile",
             "openrouter/mistralai/mistral-7b-instruct:free"
         ]
+        tier = "full"
         logger.info(f"Brain (full tier): provider={provider_name}, model={model_name}")
 
-    context = await get_conversation_context(chat_id)
+    hedge = brain_config.get("hedge", {}).get(tier)
+    single_pass = brain_config.get("single_pass", False)
+
+    context = await get_conversation_context(chat_id, turn)
     
     if media:
         media_desc = f"\n\nMedia attached: {media.get('type', 'unknown')}"
@@ -109,7 +171,9 @@ async def decide(chat_id: int, message: str, media: Optional[Dict[str, Any]] = N
     else:
         media_desc = ""
 
-    prompt = f"""{BRAIN_SYSTEM_PROMPT}
+    system_prompt = f"{BRAIN_SYSTEM_PROMPT}\n\n{SINGLE_PASS_INSTRUCTIONS}" if single_pass else BRAIN_SYSTEM_PROMPT
+
+    prompt = f"""{system_prompt}
 
 Recent conversation context:
 {context}
@@ -140,10 +204,14 @@ User message: {message}
         response = await providers.call_with_fallback(
             f"{provider_name}/{model_name}",
             messages,
-            fallback
+            fallback,
+            hedge=hedge,
+            json_schema=BRAIN_RESPONSE_SCHEMA if single_pass else None
         )
 
-        decision = parse_brain_response(response)
+        decision = parse_brain_response(response, single_pass)
+        decision["source"] = "brain"
+        decision["single_pass"] = single_pass
         logger.info(f"Brain decision: action={decision.get('action')}, confidence={decision.get('confidence')}, reasoning={decision.get('reasoning')}")
         return decision
 
@@ -159,18 +227,36 @@ User message: {message}
             "response": f"I encountered an issue processing your request. Please try again. Error: {str(e)[:100]}"
         }
 
-def parse_brain_response(response: str) -> Dict[str, Any]:
-    default_decision = {
-        "action": "answer_directly",
-        "confidence": "high",
-        "search_query": None,
-        "fetch_full_page": False,
-        "specialist": None,
-        "capability": "chat",
-        "reasoning": "Failed to parse brain response, defaulting to direct answer",
-        "response": None
-    }
+def _looks_like_json(text: str) -> bool:
+    stripped = text.lstrip()
+    return stripped.startswith(("{", "[")) or bool(JSON_KEY_PATTERN.search(text))
+
+def _salvage_brain_response(response: str, single_pass: bool) -> Dict[str, Any]:
+    match = JSON_OBJECT_PATTERN.search(response)
+    if match:
+        try:
+            parsed = json.loads(match.group(0))
+            if isinstance(parsed, dict):
+                return parsed
+        except json.JSONDecodeError:
+            pass
+
+    if single_pass:
+        field = RESPONSE_FIELD_PATTERN.search(response)
+        if field:
+            try:
+                text = json.loads(f'"{field.group(1)}"')
+            except json.JSONDecodeError:
+                text = field.group(1)
+            if text.strip():
+                return {"action": "answer_directly", "response": text, "reasoning": "Salvaged response from malformed brain JSON"}
+
+        if response.strip() and not _looks_like_json(response):
+            return {"action": "answer_directly", "response": response, "reasoning": "Brain answered in plain text"}
+        return dict(DEFAULT_DECISION, response=SINGLE_PASS_FALLBACK, reasoning="Unparseable brain response, using fallback answer")
+    return dict(DEFAULT_DECISION, reasoning="Unparseable brain response, defaulting to direct answer")
 
+def parse_brain_response(response: str, single_pass: bool = False) -> Dict[str, Any]:
     try:
         response = response.strip()
         if response.startswith("```json"):
@@ -181,12 +267,15 @@ def parse_brain_response(response: str) -> Dict[str, Any]:
             response = response[:-3]
         response = response.strip()
 
-        parsed = json.loads(response)
+        try:
+            parsed = json.loads(response)
+        except json.JSONDecodeError:
+            parsed = _salvage_brain_response(response, single_pass)
         
         required_fields = ["action", "confidence", "reasoning"]
         for field in required_fields:
             if field not in parsed:
-                parsed[field] = default_decision[field]
+                parsed[field] = DEFAULT_DECISION[field]
 
         if "search_query" not in parsed:
             parsed["search_query"] = None
@@ -203,6 +292,6 @@ def parse_brain_response(response: str) -> Dict[str, Any]:
 
     except (json.JSONDecodeError, Exception) as e:
         return {
-            **default_decision,
+            **DEFAULT_DECISION,
             "reasoning": f"Parse error: {str(e)[:40]}, defaulting to direct answer"
         }
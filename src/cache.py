@@ -0,0 +1,113 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import timezone
+from typing import Dict, Any, Optional, List, Tuple
+from src import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 3600
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_BYTES = 4_000_000
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+def make_cache_key(provider_model: str, messages: List[Dict[str, str]], params: Optional[Dict[str, Any]] = None) -> str:
+    normalized = [
+        {"role": m.get("role", "user"), "content": WHITESPACE_PATTERN.sub(" ", str(m.get("content", ""))).strip()}
+        for m in messages
+    ]
+    payload = json.dumps([provider_model, normalized, params or {}], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    def __init__(self):
+        self.entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _settings(self) -> Dict[str, Any]:
+        return config.RESPONSE_CACHE_SETTINGS
+
+    def enabled(self) -> bool:
+        return self._settings().get("enabled", True)
+
+    def _evict(self, key: str):
+        _, value = self.entries.pop(key)
+        self.size_bytes -= len(value.encode("utf-8"))
+
+    def _store(self, key: str, value: str, expires_at: float):
+        if key in self.entries:
+            self._evict(key)
+        self.entries[key] = (expires_at, value)
+        self.size_bytes += len(value.encode("utf-8"))
+        max_entries = self._settings().get("max_entries", DEFAULT_MAX_ENTRIES)
+        max_bytes = self._settings().get("max_bytes", DEFAULT_MAX_BYTES)
+        while self.entries and (len(self.entries) > max_entries or self.size_bytes > max_bytes):
+            self._evict(next(iter(self.entries)))
+
+    def get_local(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            self._evict(key)
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.get_local(key)
+        if value is None and self._settings().get("persistent"):
+            value, expires_at = await self._get_persistent(key)
+            if value is not None:
+                self._store(key, value, expires_at)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None):
+        if ttl is None:
+            ttl = self._settings().get("ttl", DEFAULT_TTL)
+        expires_at = time.time() + ttl
+        self._store(key, value, expires_at)
+        if self._settings().get("persistent"):
+            await self._set_persistent(key, value, expires_at)
+
+    async def _get_persistent(self, key: str) -> Tuple[Optional[str], float]:
+        from src import db
+        try:
+            row = await db.get_cached_response(key)
+        except Exception as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None, 0.0
+        if not row:
+            return None, 0.0
+        return row["response"], row["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+
+    async def _set_persistent(self, key: str, value: str, expires_at: float):
+        from src import db
+        try:
+            await db.set_cached_response(key, value, expires_at)
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+response_cache = ResponseCache()
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Deque
+from src import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT_TURNS = 4
+DEFAULT_SUPERSEDE_WINDOW = 3.0
+
+TurnRunner = Callable[[List[str]], Awaitable[None]]
+
+class PendingTurn:
+    def __init__(self, texts: List[str], runner: TurnRunner, mergeable: bool):
+        self.texts = texts
+        self.runner = runner
+        self.mergeable = mergeable
+        self.created_at = time.monotonic()
+        self.last_arrival = self.created_at
+        self.task: Optional[asyncio.Task] = None
+        self.replying = False
+
+    def merge(self, text: str, runner: TurnRunner):
+        self.texts.append(text)
+        self.runner = runner
+        self.last_arrival = time.monotonic()
+
+class ChatLane:
+    def __init__(self):
+        self.pending: Deque[PendingTurn] = deque()
+        self.active: Optional[PendingTurn] = None
+        self.worker: Optional[asyncio.Task] = None
+
+lanes: Dict[int, ChatLane] = {}
+semaphore: Optional[asyncio.Semaphore] = None
+stats: Dict[str, int] = {"turns": 0, "merged": 0, "superseded": 0, "failed": 0}
+
+def _settings() -> Dict[str, Any]:
+    return config.BOT_CONFIG.get("chat_queue", {})
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global semaphore
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(_settings().get("max_concurrent_turns", DEFAULT_MAX_CONCURRENT_TURNS))
+    return semaphore
+
+def _within_window(since: float) -> bool:
+    window = _settings().get("supersede_window", DEFAULT_SUPERSEDE_WINDOW)
+    return time.monotonic() - since <= window
+
+def submit(chat_id: int, text: str, runner: TurnRunner, mergeable: bool = True):
+    lane = lanes.setdefault(chat_id, ChatLane())
+    if mergeable and _settings().get("supersede", False):
+        queued = lane.pending[-1] if lane.pending else None
+        active = lane.active
+        if queued is not None and queued.mergeable and _within_window(queued.created_at):
+            queued.merge(text, runner)
+            stats["merged"] += 1
+            return
+        if (queued is None and active is not None and active.mergeable and not active.replying
+                and active.task is not None and not active.task.done() and _within_window(active.last_arrival)):
+            active.task.cancel()
+            replacement = PendingTurn(active.texts + [text], runner, True)
+            lane.pending.append(replacement)
+            stats["superseded"] += 1
+            logger.info(f"Superseding in-flight turn for chat {chat_id} ({len(replacement.texts)} messages merged)")
+            _ensure_worker(chat_id, lane)
+            return
+    lane.pending.append(PendingTurn([text], runner, mergeable))
+    _ensure_worker(chat_id, lane)
+
+def mark_replying(chat_id: int):
+    lane = lanes.get(chat_id)
+    if lane is not None and lane.active is not None and lane.active.task is asyncio.current_task():
+        lane.active.replying = True
+
+def _ensure_worker(chat_id: int, lane: ChatLane):
+    if lane.worker is None or lane.worker.done():
+        lane.worker = asyncio.create_task(_drain(chat_id, lane))
+
+async def _drain(chat_id: int, lane: ChatLane):
+    try:
+        while lane.pending:
+            async with _get_semaphore():
+                entry = lane.pending.popleft()
+                lane.active = entry
+                entry.task = asyncio.create_task(entry.runner(list(entry.texts)))
+                await asyncio.wait({entry.task})
+                lane.active = None
+            if entry.task.cancelled():
+                continue
+            stats["turns"] += 1
+            error = entry.task.exception()
+            if error is not None:
+                stats["failed"] += 1
+                logger.error(f"Turn for chat {chat_id} failed: {error}")
+    finally:
+        if lanes.get(chat_id) is lane and not lane.pending:
+            lanes.pop(chat_id, None)
+
+def active_chats() -> int:
+    return sum(1 for lane in lanes.values() if lane.active is not None)
+
+def queued_turns() -> int:
+    return sum(len(lane.pending) for lane in lanes.values())
+
+def get_stats() -> Dict[str, Any]:
+    return {"active": active_chats(), "queued": queued_turns(), **stats}
+
+async def stop():
+    workers = [lane.worker for lane in lanes.values() if lane.worker is not None and not lane.worker.done()]
+    if not workers:
+        return
+    timeout = _settings().get("drain_timeout", 25.0)
+    _, still_running = await asyncio.wait(workers, timeout=timeout)
+    if still_running:
+        logger.warning(f"Chat queue drain timed out with {len(still_running)} chats still running")
+        for lane in list(lanes.values()):
+            lane.pending.clear()
+            if lane.active is not None and lane.active.task is not None:
+                lane.active.task.cancel()
+        await asyncio.gather(*still_running, return_exceptions=True)
@@ -18,6 +18,9 @@ if ALLOWED_CHAT_IDS_STR:
 
 ALLOWED_COMMANDS = ["ls", "pwd", "date", "uptime", "df", "free", "echo"]
 
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").strip().lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "data/picoclaw.db")
+
 MYSQL_HOST = os.getenv("MYSQL_HOST", "")
 MYSQL_PORT = int(os.getenv("MYSQL_PORT", "3306"))
 MYSQL_USER = os.getenv("MYSQL_USER", "")
@@ -62,6 +65,11 @@ PROVIDERS = BOT_CONFIG.get("providers", {})
 AGENTS = BOT_CONFIG.get("agents", {})
 ROUTING = BOT_CONFIG.get("routing", {})
 BOT_SETTINGS = BOT_CONFIG.get("bot", {})
+HTTP_SETTINGS = BOT_CONFIG.get("http", {})
+HEDGING_SETTINGS = BOT_CONFIG.get("hedging", {})
+CIRCUIT_BREAKER_SETTINGS = BOT_CONFIG.get("circuit_breaker", {})
+RATE_LIMIT_SETTINGS = BOT_CONFIG.get("rate_limits", {})
+RESPONSE_CACHE_SETTINGS = BOT_CONFIG.get("response_cache", {})
 
 DEFAULT_PROVIDER = AGENTS.get("default", {}).get("provider", "openrouter")
 DEFAULT_MODEL = AGENTS.get("default", {}).get("model", "mistralai/mistral-7b-instruct:free")
@@ -71,6 +79,9 @@ REQUIRED_VARS = [
     "TELEGRAM_BOT_TOKEN",
     "RENDER_APP_URL",
     "ALLOWED_CHAT_IDS",
+]
+
+MYSQL_REQUIRED_VARS = [
     "MYSQL_HOST",
     "MYSQL_USER",
     "MYSQL_PASSWORD",
@@ -78,7 +89,10 @@ REQUIRED_VARS = [
 ]
 
 def validate_config():
-    missing = [var for var in REQUIRED_VARS if not os.getenv(var, "")]
+    if DB_BACKEND not in ("mysql", "sqlite"):
+        raise ValueError(f"Unsupported DB_BACKEND: {DB_BACKEND} (expected mysql or sqlite)")
+    required = REQUIRED_VARS + (MYSQL_REQUIRED_VARS if DB_BACKEND == "mysql" else [])
+    missing = [var for var in required if not os.getenv(var, "")]
     if missing:
         raise ValueError(f"Missing required env vars: {', '.join(missing)}")
     return True
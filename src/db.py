@@ -1,78 +1,189 @@
 import aiomysql
 import asyncio
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any, Callable, TypeVar
-from src import config
-
-
-async def _prepare_for_history(role: str, text: str) -> str:
-    if role != "assistant" or not text or len(text) <= 500:
-        return text
-
-    try:
-        from src import providers
-
-        summary_messages = [
-            {
-                "role": "system",
-                "content": (
-                    "You are a conversation history summarizer. "
-                    "Summarize the assistant response in 1-2 sentences capturing: "
-                    "what was provided, key details, function/class names if code. "
-                    "Be specific enough that a follow-up request like 'fix that code' "
-                    "or 'tell me more' makes sense. "
-                    "Return only the summary, no preamble."
-                )
-            },
-            {
-                "role": "user",
-                "content": f"Summarize this assistant response:\n\n{text[:3000]}"
-            }
-        ]
-
-        summary = await providers.call_with_fallback(
-            "groq/llama-3.1-8b-instant",
-            summary_messages,
-            fallback=["openrouter/mistralai/mistral-7b-instruct:free"],
-        )
-
-        if summary and len(summary) < len(text):
-            return f"[Summary: {summary.strip()}]"
-        return text[:500] + "\n[...truncated for history...]"
-
-    except Exception:
-        return text[:500] + "\n[...truncated for history...]"
+import bisect
+import functools
+import logging
+import random
+import sqlite3
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Dict, Any, Callable, TypeVar, Tuple
+from src import config, sqlite_backend
+
+logger = logging.getLogger(__name__)
 
 pool: Optional[aiomysql.Pool] = None
 _UNSET = object()
-
-def retry_on_operational_error(func):
+OPERATIONAL_ERRORS = (aiomysql.OperationalError, sqlite3.OperationalError)
+
+SESSION_CACHE_TTL = 300
+session_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+pending_message_counts: Counter = Counter()
+session_count_lock: Optional[asyncio.Lock] = None
+shortcut_cache: Dict[int, Dict[str, str]] = {}
+
+WRITE_BUFFER_MAX_ROWS = 50
+WRITE_BUFFER_INTERVAL = 1.0
+WRITE_BUFFER_MAX_PENDING = 2000
+write_buffer: List[Tuple[int, List[Tuple[str, str, bool]], List[Tuple[str, str, Optional[str]]]]] = []
+write_buffer_full: Optional[asyncio.Event] = None
+write_flush_task: Optional[asyncio.Task] = None
+write_lock: Optional[asyncio.Lock] = None
+
+DEFAULT_POOL_MIN_SIZE = 2
+DEFAULT_POOL_MAX_SIZE = 10
+DEFAULT_ACQUIRE_TIMEOUT = 5.0
+DEFAULT_POOL_RECYCLE = 3600
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 0.1
+DEFAULT_BACKOFF_MAX = 2.0
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+pool_stats: Dict[str, int] = {"acquired": 0, "in_use": 0, "waiting": 0, "peak_in_use": 0, "exhausted": 0, "timeouts": 0, "acquire_errors": 0, "retries": 0}
+wait_histogram: List[int] = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+class PoolUnavailable(Exception):
+    pass
+
+class PoolTimeout(PoolUnavailable):
+    pass
+
+def _pool_settings() -> Dict[str, Any]:
+    return config.BOT_CONFIG.get("db_pool", {})
+
+def _backoff(attempt: int) -> float:
+    base = _pool_settings().get("backoff_base", DEFAULT_BACKOFF_BASE)
+    cap = _pool_settings().get("backoff_max", DEFAULT_BACKOFF_MAX)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def retry_on_operational_error(func=None, *, idempotent: bool = True):
+    if func is None:
+        return lambda f: retry_on_operational_error(f, idempotent=idempotent)
+    retryable = (PoolUnavailable, *OPERATIONAL_ERRORS) if idempotent else (PoolUnavailable,)
+
+    @functools.wraps(func)
     async def wrapper(*args, **kwargs):
-        try:
-            return await func(*args, **kwargs)
-        except aiomysql.OperationalError:
+        max_retries = _pool_settings().get("max_retries", DEFAULT_MAX_RETRIES)
+        for attempt in range(max_retries + 1):
             try:
-                if pool:
-                    async with pool.acquire() as conn:
-                        await conn.ping(reconnect=True)
                 return await func(*args, **kwargs)
-            except aiomysql.OperationalError:
+            except PoolTimeout:
                 raise
+            except retryable as e:
+                if attempt == max_retries:
+                    raise
+                pool_stats["retries"] += 1
+                delay = _backoff(attempt)
+                logger.warning(f"{func.__name__} failed ({e}), retry {attempt + 1}/{max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
     return wrapper
 
+def _record_wait(seconds: float):
+    wait_histogram[bisect.bisect_left(WAIT_BUCKETS_MS, seconds * 1000)] += 1
+
+@asynccontextmanager
+async def _acquire():
+    timeout = _pool_settings().get("acquire_timeout", DEFAULT_ACQUIRE_TIMEOUT)
+    if pool_stats["in_use"] + pool_stats["waiting"] >= pool.maxsize:
+        pool_stats["exhausted"] += 1
+    pool_stats["waiting"] += 1
+    started = time.monotonic()
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pool_stats["timeouts"] += 1
+        raise PoolTimeout(f"No database connection within {timeout}s ({pool_stats['in_use']} in use)")
+    except OPERATIONAL_ERRORS as e:
+        pool_stats["acquire_errors"] += 1
+        raise PoolUnavailable(f"Could not open a database connection: {e}")
+    finally:
+        pool_stats["waiting"] -= 1
+    _record_wait(time.monotonic() - started)
+    pool_stats["acquired"] += 1
+    pool_stats["in_use"] += 1
+    pool_stats["peak_in_use"] = max(pool_stats["peak_in_use"], pool_stats["in_use"])
+    try:
+        yield conn
+    finally:
+        pool_stats["in_use"] -= 1
+        await pool.release(conn)
+
+def _wait_percentile(fraction: float) -> Optional[float]:
+    total = sum(wait_histogram)
+    if not total:
+        return None
+    running = 0
+    for index, count in enumerate(wait_histogram):
+        running += count
+        if running >= total * fraction:
+            return WAIT_BUCKETS_MS[index] if index < len(WAIT_BUCKETS_MS) else float("inf")
+    return None
+
+def get_pool_stats() -> Dict[str, Any]:
+    labels = [f"<={bound}ms" for bound in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}ms"]
+    return {
+        "size": pool.size if pool else 0,
+        "free": pool.freesize if pool else 0,
+        "max_size": pool.maxsize if pool else 0,
+        "wait_p50_ms": _wait_percentile(0.5),
+        "wait_p95_ms": _wait_percentile(0.95),
+        "wait_histogram": dict(zip(labels, wait_histogram)),
+        **pool_stats,
+    }
+
+async def _prewarm(count: int):
+    async def warm():
+        async with _acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT 1")
+
+    await asyncio.gather(*(warm() for _ in range(count)))
+    for index in range(len(wait_histogram)):
+        wait_histogram[index] = 0
+    pool_stats.update(acquired=0, peak_in_use=0)
+    logger.info(f"Database pool pre-warmed with {pool.size} connections")
+
+def is_sqlite() -> bool:
+    return config.DB_BACKEND == "sqlite"
+
+def _upsert_sql(table: str, columns: Tuple[str, ...], key: Tuple[str, ...], updates: Tuple[str, ...]) -> str:
+    placeholders = ", ".join(["%s"] * len(columns))
+    insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    if is_sqlite():
+        assignments = ", ".join(f"{column} = excluded.{column}" for column in updates)
+        return f"{insert} ON CONFLICT ({', '.join(key)}) DO UPDATE SET {assignments}"
+    assignments = ", ".join(f"{column} = VALUES({column})" for column in updates)
+    return f"{insert} ON DUPLICATE KEY UPDATE {assignments}"
+
+def _limited_delete_sql(table: str, where: str, order_by: str) -> str:
+    if is_sqlite():
+        return f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} ORDER BY {order_by} LIMIT %s)"
+    return f"DELETE FROM {table} WHERE {where} ORDER BY {order_by} LIMIT %s"
+
 async def init_db():
     global pool
-    pool = await aiomysql.create_pool(
-        host=config.MYSQL_HOST,
-        port=config.MYSQL_PORT,
-        user=config.MYSQL_USER,
-        password=config.MYSQL_PASSWORD,
-        db=config.MYSQL_DB,
-        autocommit=True,
-        minsize=1,
-        maxsize=5,
-    )
-    await create_tables()
+    settings = _pool_settings()
+    min_size = settings.get("min_size", DEFAULT_POOL_MIN_SIZE)
+    if is_sqlite():
+        pool = await sqlite_backend.create_pool(config.SQLITE_PATH, settings.get("sqlite_size", sqlite_backend.DEFAULT_POOL_SIZE))
+        await sqlite_backend.create_tables(pool)
+    else:
+        pool = await aiomysql.create_pool(
+            host=config.MYSQL_HOST,
+            port=config.MYSQL_PORT,
+            user=config.MYSQL_USER,
+            password=config.MYSQL_PASSWORD,
+            db=config.MYSQL_DB,
+            autocommit=True,
+            minsize=min_size,
+            maxsize=settings.get("max_size", DEFAULT_POOL_MAX_SIZE),
+            pool_recycle=settings.get("recycle", DEFAULT_POOL_RECYCLE),
+        )
+        await create_tables()
+    if settings.get("prewarm", True):
+        await _prewarm(min(min_size, pool.maxsize))
 
 async def create_tables():
     create_conversation_table = """
@@ -81,8 +192,10 @@ async def create_tables():
         chat_id BIGINT NOT NULL,
         role ENUM('user', 'assistant') NOT NULL,
         content TEXT NOT NULL,
+        needs_summary BOOL DEFAULT FALSE,
+        is_summary BOOL DEFAULT FALSE,
         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-        INDEX idx_chat_id (chat_id),
+        INDEX idx_chat_id_id (chat_id, id),
         INDEX idx_timestamp (timestamp)
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
     """
@@ -105,8 +218,9 @@ async def create_tables():
         chat_id BIGINT NOT NULL,
         command VARCHAR(255) NOT NULL,
         output TEXT,
+        input TEXT,
         created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-        INDEX idx_chat_id (chat_id)
+        INDEX idx_chat_id_created_at (chat_id, created_at)
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
     """
 
@@ -129,7 +243,8 @@ async def create_tables():
         content TEXT NOT NULL,
         tags VARCHAR(255),
         created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-        INDEX idx_chat_id (chat_id)
+        INDEX idx_chat_id (chat_id),
+        FULLTEXT KEY ft_content_tags (content, tags)
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
     """
 
@@ -145,6 +260,15 @@ async def create_tables():
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
     """
 
+    create_llm_cache_table = """
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        cache_key CHAR(64) PRIMARY KEY,
+        response MEDIUMTEXT NOT NULL,
+        expires_at DATETIME NOT NULL,
+        INDEX idx_expires_at (expires_at)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """
+
     create_destroy_log_table = """
     CREATE TABLE IF NOT EXISTS destroy_log (
         id INT AUTO_INCREMENT PRIMARY KEY,
@@ -153,7 +277,7 @@ async def create_tables():
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
     """
 
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute(create_conversation_table)
             await cur.execute(create_reminders_table)
@@ -161,31 +285,106 @@ async def create_tables():
             await cur.execute(create_sessions_table)
             await cur.execute(create_notes_table)
             await cur.execute(create_shortcuts_table)
+            await cur.execute(create_llm_cache_table)
             await cur.execute(create_destroy_log_table)
+            await _ensure_column(cur, "conversation_history", "needs_summary", "BOOL DEFAULT FALSE")
+            await _ensure_column(cur, "conversation_history", "is_summary", "BOOL DEFAULT FALSE")
+            await _ensure_index(cur, "conversation_history", "idx_chat_id_id", "INDEX idx_chat_id_id (chat_id, id)")
+            await _ensure_column(cur, "command_logs", "input", "TEXT")
+            await _ensure_index(cur, "command_logs", "idx_chat_id_created_at", "INDEX idx_chat_id_created_at (chat_id, created_at)")
+            await _ensure_index(cur, "notes", "ft_content_tags", "FULLTEXT INDEX ft_content_tags (content, tags)")
+            await _ensure_column(cur, "notes", "embedding", "BLOB")
+            await _ensure_column(cur, "notes", "embedding_model", "VARCHAR(128)")
+
+async def _ensure_column(cur, table: str, column: str, definition: str):
+    await cur.execute(
+        "SELECT COUNT(*) FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table, column)
+    )
+    row = await cur.fetchone()
+    if not row or row[0] == 0:
+        await cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+async def _ensure_index(cur, table: str, index: str, definition: str):
+    await cur.execute(
+        "SELECT COUNT(*) FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+        (table, index)
+    )
+    row = await cur.fetchone()
+    if not row or row[0] == 0:
+        await cur.execute(f"ALTER TABLE {table} ADD {definition}")
 
 async def close_db():
     global pool
     if pool:
+        await flush_writes()
+        if write_flush_task is not None:
+            write_flush_task.cancel()
+            await asyncio.gather(write_flush_task, return_exceptions=True)
+        await flush_session_counts()
         try:
             pool.close()
             await pool.wait_closed()
         except Exception:
             pass
 
-@retry_on_operational_error
 async def add_message(chat_id: int, role: str, content: str):
-    content = await _prepare_for_history(role, content)
-    async with pool.acquire() as conn:
+    await write_turn(chat_id, [(role, content)])
+
+async def add_exchange(chat_id: int, user_message: str, assistant_message: str):
+    await write_turn(chat_id, [("user", user_message), ("assistant", assistant_message)])
+
+@retry_on_operational_error
+async def update_message_content(message_id: int, content: str):
+    async with _acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "UPDATE conversation_history SET content = %s, needs_summary = FALSE WHERE id = %s AND is_summary = FALSE",
+                (content, message_id)
+            )
+
+@retry_on_operational_error
+async def get_unsummarized_messages(limit: int = 100) -> List[Dict[str, Any]]:
+    async with _acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute(
+                "SELECT id, content FROM conversation_history WHERE needs_summary = TRUE ORDER BY id LIMIT %s",
+                (limit,)
+            )
+            return await cur.fetchall()
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+@retry_on_operational_error
+async def get_cached_response(cache_key: str) -> Optional[Dict[str, Any]]:
+    if not pool:
+        return None
+    async with _acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute(
+                "SELECT response, expires_at FROM llm_cache WHERE cache_key = %s AND expires_at > %s",
+                (cache_key, _utc_now())
+            )
+            row = await cur.fetchone()
+            return dict(row) if row else None
+
+@retry_on_operational_error
+async def set_cached_response(cache_key: str, response: str, expires_at: float):
+    if not pool:
+        return
+    expires = datetime.fromtimestamp(expires_at, timezone.utc).replace(tzinfo=None)
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute(
-                "INSERT INTO conversation_history (chat_id, role, content) VALUES (%s, %s, %s)",
-                (chat_id, role, content)
+                _upsert_sql("llm_cache", ("cache_key", "response", "expires_at"), ("cache_key",), ("response", "expires_at")),
+                (cache_key, response, expires)
             )
 
 @retry_on_operational_error
 async def get_destroy_attempts(days: int = 15) -> int:
     cutoff = datetime.now() - timedelta(days=days)
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute(
                 "SELECT COUNT(*) FROM destroy_log WHERE success = TRUE AND attempt_at > %s",
@@ -196,7 +395,7 @@ async def get_destroy_attempts(days: int = 15) -> int:
 
 @retry_on_operational_error
 async def get_next_destroy_available() -> datetime:
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute(
                 "SELECT attempt_at FROM destroy_log WHERE success = TRUE ORDER BY attempt_at ASC LIMIT 1"
@@ -206,9 +405,9 @@ async def get_next_destroy_available() -> datetime:
                 return row[0] + timedelta(days=15)
             return datetime.now()
 
-@retry_on_operational_error
+@retry_on_operational_error(idempotent=False)
 async def log_destroy_attempt(success: bool):
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute(
                 "INSERT INTO destroy_log (success) VALUES (%s)",
@@ -217,49 +416,118 @@ async def log_destroy_attempt(success: bool):
 
 @retry_on_operational_error
 async def destroy_all() -> list:
-    tables = ["conversation_history", "sessions", "command_logs", "notes", "shortcuts", "reminders", "destroy_log"]
-    async with pool.acquire() as conn:
+    await flush_writes()
+    tables = ["conversation_history", "sessions", "command_logs", "notes", "shortcuts", "reminders", "llm_cache", "destroy_log"]
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             for table in tables:
                 await cur.execute(f"DELETE FROM {table}")
+    invalidate_caches()
     return tables
 
 @retry_on_operational_error
 async def destroy_partial() -> list:
-    tables = ["conversation_history", "sessions", "command_logs", "shortcuts"]
-    async with pool.acquire() as conn:
+    await flush_writes()
+    tables = ["conversation_history", "sessions", "command_logs", "shortcuts", "llm_cache"]
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             for table in tables:
                 await cur.execute(f"DELETE FROM {table}")
+    invalidate_caches()
     return tables
 
 @retry_on_operational_error
-async def get_conversation_history(chat_id: int, limit: int = None) -> List[Dict[str, Any]]:
+async def get_conversation_history(chat_id: int, limit: int = None, before_id: Optional[int] = None) -> List[Dict[str, Any]]:
     if limit is None:
         limit = config.MAX_HISTORY * 2
-    async with pool.acquire() as conn:
+    if _has_buffered_messages(chat_id):
+        await flush_writes()
+    async with _acquire() as conn:
         async with conn.cursor(aiomysql.DictCursor) as cur:
+            if before_id is None:
+                await cur.execute(
+                    "SELECT id, role, content FROM conversation_history WHERE chat_id = %s ORDER BY id DESC LIMIT %s",
+                    (chat_id, limit)
+                )
+            else:
+                await cur.execute(
+                    "SELECT id, role, content FROM conversation_history WHERE chat_id = %s AND id < %s ORDER BY id DESC LIMIT %s",
+                    (chat_id, before_id, limit)
+                )
+            rows = list(reversed(await cur.fetchall()))
+            if before_id is None and len(rows) == limit:
+                await cur.execute(
+                    "SELECT id, role, content, is_summary FROM conversation_history WHERE chat_id = %s ORDER BY id LIMIT 1",
+                    (chat_id,)
+                )
+                oldest = await cur.fetchone()
+                if oldest and oldest["is_summary"] and oldest["id"] < rows[0]["id"]:
+                    rows.insert(0, {"id": oldest["id"], "role": oldest["role"], "content": oldest["content"]})
+            return rows
+
+@retry_on_operational_error
+async def get_chats_over_history_limit(max_rows: int) -> List[int]:
+    async with _acquire() as conn:
+        async with conn.cursor() as cur:
             await cur.execute(
-                """SELECT role, content FROM conversation_history 
-                   WHERE chat_id = %s 
-                   ORDER BY timestamp DESC LIMIT %s""",
-                (chat_id, limit)
+                "SELECT chat_id FROM conversation_history GROUP BY chat_id HAVING COUNT(*) > %s",
+                (max_rows,)
             )
-            rows = await cur.fetchall()
-            return list(reversed(rows))
+            return [row[0] for row in await cur.fetchall()]
+
+@retry_on_operational_error
+async def get_compactable_messages(chat_id: int, keep: int, limit: int) -> List[Dict[str, Any]]:
+    async with _acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute(
+                "SELECT id FROM conversation_history WHERE chat_id = %s ORDER BY id DESC LIMIT 1 OFFSET %s",
+                (chat_id, keep)
+            )
+            boundary = await cur.fetchone()
+            if not boundary:
+                return []
+            await cur.execute(
+                """SELECT id, role, content, is_summary FROM conversation_history
+                   WHERE chat_id = %s AND id <= %s ORDER BY id LIMIT %s""",
+                (chat_id, boundary["id"], limit + 1)
+            )
+            return await cur.fetchall()
+
+@retry_on_operational_error
+async def compact_messages(chat_id: int, summary_id: int, summary: str, message_ids: List[int]):
+    async with _acquire() as conn:
+        await conn.begin()
+        try:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """UPDATE conversation_history SET role = 'assistant', content = %s, is_summary = TRUE, needs_summary = FALSE
+                       WHERE id = %s AND chat_id = %s""",
+                    (summary, summary_id, chat_id)
+                )
+                if message_ids:
+                    placeholders = ", ".join(["%s"] * len(message_ids))
+                    await cur.execute(
+                        f"DELETE FROM conversation_history WHERE chat_id = %s AND id IN ({placeholders})",
+                        (chat_id, *message_ids)
+                    )
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
 
 @retry_on_operational_error
 async def clear_conversation(chat_id: int):
-    async with pool.acquire() as conn:
+    await flush_writes()
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute(
                 "DELETE FROM conversation_history WHERE chat_id = %s",
                 (chat_id,)
             )
 
-@retry_on_operational_error
+@retry_on_operational_error(idempotent=False)
 async def add_reminder(chat_id: int, message: str, remind_at: datetime) -> int:
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute(
                 "INSERT INTO reminders (chat_id, message, remind_at) VALUES (%s, %s, %s)",
@@ -269,52 +537,233 @@ async def add_reminder(chat_id: int, message: str, remind_at: datetime) -> int:
 
 @retry_on_operational_error
 async def get_pending_reminders() -> List[Dict[str, Any]]:
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor(aiomysql.DictCursor) as cur:
             await cur.execute(
-                "SELECT id, chat_id, message, remind_at FROM reminders WHERE remind_at > NOW() ORDER BY remind_at"
+                "SELECT id, chat_id, message, remind_at FROM reminders WHERE remind_at > %s ORDER BY remind_at",
+                (datetime.now(),)
             )
             return await cur.fetchall()
 
 @retry_on_operational_error
 async def delete_reminder(reminder_id: int):
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute("DELETE FROM reminders WHERE id = %s", (reminder_id,))
 
 @retry_on_operational_error
 async def get_all_reminders(chat_id: int) -> List[Dict[str, Any]]:
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor(aiomysql.DictCursor) as cur:
             await cur.execute(
-                "SELECT id, message, remind_at FROM reminders WHERE chat_id = %s AND remind_at > NOW() ORDER BY remind_at",
-                (chat_id,)
+                "SELECT id, message, remind_at FROM reminders WHERE chat_id = %s AND remind_at > %s ORDER BY remind_at",
+                (chat_id, datetime.now())
+            )
+            return await cur.fetchall()
+
+async def log_command(chat_id: int, command: str, output: str, input_text: Optional[str] = None):
+    await write_turn(chat_id, [], [(command, output, input_text)])
+
+@retry_on_operational_error
+async def get_logged_decisions(limit: int = 5000) -> List[Dict[str, Any]]:
+    async with _acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute(
+                "SELECT input, command FROM command_logs WHERE input IS NOT NULL ORDER BY id DESC LIMIT %s",
+                (limit,)
             )
             return await cur.fetchall()
 
 @retry_on_operational_error
-async def log_command(chat_id: int, command: str, output: str):
-    async with pool.acquire() as conn:
+async def get_command_log_chats() -> List[int]:
+    async with _acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT DISTINCT chat_id FROM command_logs")
+            return [row[0] for row in await cur.fetchall()]
+
+@retry_on_operational_error
+async def purge_command_logs(chat_id: int, cutoff: datetime, limit: int) -> int:
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute(
-                "INSERT INTO command_logs (chat_id, command, output) VALUES (%s, %s, %s)",
-                (chat_id, command, output)
+                _limited_delete_sql("command_logs", "chat_id = %s AND created_at < %s", "created_at"),
+                (chat_id, cutoff, limit)
             )
-    await cleanup_old_logs(chat_id)
+            return cur.rowcount
 
 @retry_on_operational_error
-async def cleanup_old_logs(chat_id: int, days: int = 30):
-    cutoff = datetime.now() - timedelta(days=days)
-    async with pool.acquire() as conn:
+async def purge_expired_cache(limit: int) -> int:
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute(
-                "DELETE FROM command_logs WHERE chat_id = %s AND created_at < %s",
-                (chat_id, cutoff)
+                _limited_delete_sql("llm_cache", "expires_at < %s", "expires_at"),
+                (_utc_now(), limit)
             )
+            return cur.rowcount
 
 @retry_on_operational_error
+async def purge_stale_reminders(cutoff: datetime, limit: int) -> int:
+    async with _acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                _limited_delete_sql("reminders", "remind_at < %s", "remind_at"),
+                (cutoff, limit)
+            )
+            return cur.rowcount
+
+def _write_buffer_settings() -> Dict[str, Any]:
+    return config.BOT_CONFIG.get("write_buffer", {})
+
+def _buffered_rows() -> int:
+    return sum(len(messages) + len(logs) for _, messages, logs in write_buffer)
+
+def _has_buffered_messages(chat_id: int) -> bool:
+    return any(buffered_chat == chat_id and messages for buffered_chat, messages, _ in write_buffer)
+
+def _multi_insert(table: str, columns: Tuple[str, ...], count: int) -> str:
+    row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row] * count)}"
+
+async def _insert_messages(cur, messages: List[Tuple[int, str, str, bool]]) -> List[int]:
+    ids = []
+    for row in messages:
+        await cur.execute(_multi_insert("conversation_history", ("chat_id", "role", "content", "needs_summary"), 1), row)
+        ids.append(cur.lastrowid)
+    return ids
+
+async def _prepare_message(role: str, content: str) -> Tuple[str, str, bool]:
+    from src import summarizer
+
+    pending = summarizer.needs_summary(role, content)
+    if pending and not summarizer.is_running():
+        content = await summarizer.summarize_for_history(content)
+        pending = False
+    return role, content, pending
+
+async def write_turn(chat_id: int, messages: List[Tuple[str, str]], logs: List[Tuple[str, str, Optional[str]]] = ()):
+    global write_flush_task, write_buffer_full
+    prepared = [await _prepare_message(role, content) for role, content in messages]
+    if not prepared and not logs:
+        return
+    write_buffer.append((chat_id, prepared, list(logs)))
+    if not _write_buffer_settings().get("enabled", True):
+        await flush_writes()
+        return
+    if write_buffer_full is None:
+        write_buffer_full = asyncio.Event()
+    if _buffered_rows() >= _write_buffer_settings().get("max_rows", WRITE_BUFFER_MAX_ROWS):
+        write_buffer_full.set()
+    if write_flush_task is None or write_flush_task.done():
+        write_flush_task = asyncio.create_task(_flush_worker())
+
+async def _flush_worker():
+    interval = _write_buffer_settings().get("flush_interval", WRITE_BUFFER_INTERVAL)
+    while write_buffer:
+        try:
+            await asyncio.wait_for(write_buffer_full.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        await flush_writes()
+
+async def flush_writes():
+    global write_lock
+    if write_lock is None:
+        write_lock = asyncio.Lock()
+    async with write_lock:
+        if not write_buffer or not pool:
+            return
+        groups = list(write_buffer)
+        write_buffer.clear()
+        if write_buffer_full is not None:
+            write_buffer_full.clear()
+        try:
+            await _write_groups(groups)
+        except (PoolUnavailable, *OPERATIONAL_ERRORS) as e:
+            _requeue_writes(groups, e)
+        except Exception as e:
+            logger.warning(f"Batched flush of {len(groups)} groups failed ({e}), writing them one at a time")
+            for index, group in enumerate(groups):
+                try:
+                    await _write_groups([group])
+                except (PoolUnavailable, *OPERATIONAL_ERRORS) as e:
+                    _requeue_writes(groups[index:], e)
+                    break
+                except Exception as e:
+                    logger.error(f"Dropping {len(group[1]) + len(group[2])} buffered rows for chat {group[0]}: {e}")
+
+def _requeue_writes(groups: List[Tuple[int, List[Tuple[str, str, bool]], List[Tuple[str, str, Optional[str]]]]], error: Exception):
+    write_buffer[:0] = groups
+    max_pending = _write_buffer_settings().get("max_pending", WRITE_BUFFER_MAX_PENDING)
+    while len(write_buffer) > 1 and _buffered_rows() > max_pending:
+        dropped_chat, dropped_messages, dropped_logs = write_buffer.pop(0)
+        logger.error(f"Write buffer full, dropped {len(dropped_messages) + len(dropped_logs)} rows for chat {dropped_chat}")
+    logger.error(f"Failed to flush {len(groups)} buffered writes: {error}")
+
+@retry_on_operational_error(idempotent=False)
+async def _write_groups(groups: List[Tuple[int, List[Tuple[str, str, bool]], List[Tuple[str, str, Optional[str]]]]]):
+    from src import summarizer
+
+    messages = [(chat_id, role, content, pending) for chat_id, entries, _ in groups for role, content, pending in entries]
+    logs = [(chat_id, command, output, input_text) for chat_id, _, entries in groups for command, output, input_text in entries]
+    to_summarize = []
+    async with _acquire() as conn:
+        await conn.begin()
+        try:
+            async with conn.cursor() as cur:
+                if messages:
+                    ids = await _insert_messages(cur, messages)
+                    to_summarize = [(message_id, row[2]) for message_id, row in zip(ids, messages) if row[3]]
+                if logs:
+                    await cur.execute(
+                        _multi_insert("command_logs", ("chat_id", "command", "output", "input"), len(logs)),
+                        [value for row in logs for value in row]
+                    )
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+    for message_id, content in to_summarize:
+        summarizer.enqueue(message_id, content)
+
+def _session_cache_settings() -> Dict[str, Any]:
+    return config.BOT_CONFIG.get("session_cache", {})
+
+def _cache_session(chat_id: int, session: Dict[str, Any]):
+    if not _session_cache_settings().get("enabled", True):
+        return
+    ttl = _session_cache_settings().get("ttl", SESSION_CACHE_TTL)
+    session_cache[chat_id] = (time.monotonic() + ttl, dict(session))
+
+def _cached_session(chat_id: int) -> Optional[Dict[str, Any]]:
+    entry = session_cache.get(chat_id)
+    if entry is None:
+        return None
+    expires_at, session = entry
+    if expires_at <= time.monotonic():
+        session_cache.pop(chat_id, None)
+        return None
+    return session
+
+def invalidate_caches():
+    from src import vectors
+
+    session_cache.clear()
+    pending_message_counts.clear()
+    shortcut_cache.clear()
+    vectors.clear()
+
 async def get_session(chat_id: int) -> Dict[str, Any]:
-    async with pool.acquire() as conn:
+    session = _cached_session(chat_id)
+    if session is None:
+        async with _session_count_lock():
+            session = await _load_session(chat_id)
+            session["message_count"] = (session.get("message_count") or 0) + pending_message_counts[chat_id]
+        _cache_session(chat_id, session)
+    return dict(session)
+
+@retry_on_operational_error
+async def _load_session(chat_id: int) -> Dict[str, Any]:
+    async with _acquire() as conn:
         async with conn.cursor(aiomysql.DictCursor) as cur:
             await cur.execute(
                 "SELECT model_override, agent_override, message_count FROM sessions WHERE chat_id = %s",
@@ -331,35 +780,61 @@ async def get_session(chat_id: int) -> Dict[str, Any]:
 
 @retry_on_operational_error
 async def update_session(chat_id: int, model_override=_UNSET, agent_override=_UNSET):
-    async with pool.acquire() as conn:
-        async with conn.cursor() as cur:
-            if model_override is not _UNSET:
-                await cur.execute(
-                    "INSERT INTO sessions (chat_id, model_override) VALUES (%s, %s) ON DUPLICATE KEY UPDATE model_override = %s",
-                    (chat_id, model_override, model_override)
-                )
-            if agent_override is not _UNSET:
+    changes = {}
+    if model_override is not _UNSET:
+        changes["model_override"] = model_override
+    if agent_override is not _UNSET:
+        changes["agent_override"] = agent_override
+    if changes:
+        async with _acquire() as conn:
+            async with conn.cursor() as cur:
                 await cur.execute(
-                    "INSERT INTO sessions (chat_id, agent_override) VALUES (%s, %s) ON DUPLICATE KEY UPDATE agent_override = %s",
-                    (chat_id, agent_override, agent_override)
+                    _upsert_sql("sessions", ("chat_id", *changes), ("chat_id",), tuple(changes)),
+                    (chat_id, *changes.values())
                 )
-            await cur.execute(
-                "UPDATE sessions SET message_count = message_count + 1 WHERE chat_id = %s",
-                (chat_id,)
-            )
+    pending_message_counts[chat_id] += 1
+    session = _cached_session(chat_id)
+    if session is not None:
+        session.update(changes)
+        session["message_count"] = (session.get("message_count") or 0) + 1
 
 @retry_on_operational_error
 async def reset_session(chat_id: int):
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute(
                 "UPDATE sessions SET model_override = NULL, agent_override = NULL, message_count = 0 WHERE chat_id = %s",
                 (chat_id,)
             )
-
-@retry_on_operational_error
+    pending_message_counts.pop(chat_id, None)
+    _cache_session(chat_id, {"model_override": None, "agent_override": None, "message_count": 0})
+
+def _session_count_lock() -> asyncio.Lock:
+    global session_count_lock
+    if session_count_lock is None:
+        session_count_lock = asyncio.Lock()
+    return session_count_lock
+
+async def flush_session_counts():
+    if not pending_message_counts or not pool:
+        return
+    async with _session_count_lock():
+        counts = dict(pending_message_counts)
+        pending_message_counts.clear()
+        try:
+            async with _acquire() as conn:
+                async with conn.cursor() as cur:
+                    await cur.executemany(
+                        "UPDATE sessions SET message_count = message_count + %s WHERE chat_id = %s",
+                        [(count, chat_id) for chat_id, count in counts.items()]
+                    )
+        except Exception as e:
+            pending_message_counts.update(counts)
+            logger.error(f"Failed to flush session message counts: {e}")
+
+@retry_on_operational_error(idempotent=False)
 async def add_note(chat_id: int, content: str, tags: Optional[str] = None) -> int:
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute(
                 "INSERT INTO notes (chat_id, content, tags) VALUES (%s, %s, %s)",
@@ -369,7 +844,7 @@ async def add_note(chat_id: int, content: str, tags: Optional[str] = None) -> in
 
 @retry_on_operational_error
 async def get_notes(chat_id: int) -> List[Dict[str, Any]]:
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor(aiomysql.DictCursor) as cur:
             await cur.execute(
                 "SELECT id, content, tags, created_at FROM notes WHERE chat_id = %s ORDER BY created_at DESC",
@@ -377,9 +852,28 @@ async def get_notes(chat_id: int) -> List[Dict[str, Any]]:
             )
             return await cur.fetchall()
 
+@retry_on_operational_error
+async def get_note_embeddings(chat_id: int) -> List[Dict[str, Any]]:
+    async with _acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute(
+                "SELECT id, content, tags, embedding, embedding_model FROM notes WHERE chat_id = %s",
+                (chat_id,)
+            )
+            return await cur.fetchall()
+
+@retry_on_operational_error
+async def set_note_embedding(note_id: int, embedding: bytes, model: str):
+    async with _acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "UPDATE notes SET embedding = %s, embedding_model = %s WHERE id = %s",
+                (embedding, model, note_id)
+            )
+
 @retry_on_operational_error
 async def delete_note(note_id: int, chat_id: int):
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute(
                 "DELETE FROM notes WHERE id = %s AND chat_id = %s",
@@ -387,28 +881,58 @@ async def delete_note(note_id: int, chat_id: int):
             )
 
 @retry_on_operational_error
-async def search_notes(chat_id: int, query: str) -> List[Dict[str, Any]]:
-    async with pool.acquire() as conn:
+async def search_notes(chat_id: int, query: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+    async with _acquire() as conn:
         async with conn.cursor(aiomysql.DictCursor) as cur:
+            if is_sqlite():
+                match = sqlite_backend.fts_query(query)
+                rows = []
+                if match:
+                    await cur.execute(
+                        """SELECT notes.id, notes.content, notes.tags, notes.created_at, -bm25(notes_fts) AS score
+                           FROM notes_fts JOIN notes ON notes.id = notes_fts.rowid
+                           WHERE notes_fts MATCH %s AND notes.chat_id = %s
+                           ORDER BY score DESC, notes.created_at DESC
+                           LIMIT %s OFFSET %s""",
+                        (match, chat_id, limit, offset)
+                    )
+                    rows = await cur.fetchall()
+            else:
+                await cur.execute(
+                    """SELECT id, content, tags, created_at, MATCH(content, tags) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score
+                       FROM notes
+                       WHERE chat_id = %s AND MATCH(content, tags) AGAINST (%s IN NATURAL LANGUAGE MODE)
+                       ORDER BY score DESC, created_at DESC
+                       LIMIT %s OFFSET %s""",
+                    (query, chat_id, query, limit, offset)
+                )
+                rows = await cur.fetchall()
+            if rows or offset:
+                return rows
             await cur.execute(
-                "SELECT id, content, tags, created_at FROM notes WHERE chat_id = %s AND (content LIKE %s OR tags LIKE %s) ORDER BY created_at DESC",
-                (chat_id, f"%{query}%", f"%{query}%")
+                """SELECT id, content, tags, created_at, 0 AS score FROM notes
+                   WHERE chat_id = %s AND (content LIKE %s OR tags LIKE %s)
+                   ORDER BY created_at DESC LIMIT %s""",
+                (chat_id, f"%{query}%", f"%{query}%", limit)
             )
             return await cur.fetchall()
 
 @retry_on_operational_error
 async def add_shortcut(chat_id: int, trigger: str, expansion: str) -> int:
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute(
-                "INSERT INTO shortcuts (chat_id, `trigger`, expansion) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE expansion = %s",
-                (chat_id, trigger, expansion, expansion)
+                _upsert_sql("shortcuts", ("chat_id", "`trigger`", "expansion"), ("chat_id", "`trigger`"), ("expansion",)),
+                (chat_id, trigger, expansion)
             )
-            return cur.lastrowid
+            shortcut_id = cur.lastrowid
+    if chat_id in shortcut_cache:
+        shortcut_cache[chat_id][trigger] = expansion
+    return shortcut_id
 
 @retry_on_operational_error
 async def get_shortcuts(chat_id: int) -> List[Dict[str, Any]]:
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor(aiomysql.DictCursor) as cur:
             await cur.execute(
                 "SELECT id, `trigger`, expansion, created_at FROM shortcuts WHERE chat_id = %s ORDER BY created_at DESC",
@@ -416,9 +940,26 @@ async def get_shortcuts(chat_id: int) -> List[Dict[str, Any]]:
             )
             return await cur.fetchall()
 
+async def get_shortcut_map(chat_id: int) -> Dict[str, str]:
+    shortcut_map = shortcut_cache.get(chat_id)
+    if shortcut_map is None:
+        shortcut_map = await _load_shortcut_map(chat_id)
+        shortcut_cache[chat_id] = shortcut_map
+    return shortcut_map
+
+@retry_on_operational_error
+async def _load_shortcut_map(chat_id: int) -> Dict[str, str]:
+    async with _acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "SELECT `trigger`, expansion FROM shortcuts WHERE chat_id = %s",
+                (chat_id,)
+            )
+            return {trigger: expansion for trigger, expansion in await cur.fetchall()}
+
 @retry_on_operational_error
 async def get_shortcut(chat_id: int, trigger: str) -> Optional[Dict[str, Any]]:
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor(aiomysql.DictCursor) as cur:
             await cur.execute(
                 "SELECT id, `trigger`, expansion FROM shortcuts WHERE chat_id = %s AND `trigger` = %s",
@@ -429,9 +970,11 @@ async def get_shortcut(chat_id: int, trigger: str) -> Optional[Dict[str, Any]]:
 
 @retry_on_operational_error
 async def delete_shortcut(chat_id: int, trigger: str):
-    async with pool.acquire() as conn:
+    async with _acquire() as conn:
         async with conn.cursor() as cur:
             await cur.execute(
                 "DELETE FROM shortcuts WHERE chat_id = %s AND `trigger` = %s",
                 (chat_id, trigger)
             )
+    if chat_id in shortcut_cache:
+        shortcut_cache[chat_id].pop(trigger, None)
@@ -0,0 +1,183 @@
+import re
+from typing import List, Tuple
+
+PARSE_MODE = "MarkdownV2"
+
+SPECIAL_CHARS = re.compile(r"([_*\[\]()~`>#+\-=|{}.!\\])")
+CODE_CHARS = re.compile(r"([`\\])")
+URL_CHARS = re.compile(r"([)\\])")
+
+FENCE_PATTERN = re.compile(r"```([\w+#.-]*)[ \t]*\n?(.*?)(?:```|\Z)", re.DOTALL)
+HEADING_PATTERN = re.compile(r"^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$")
+BULLET_PATTERN = re.compile(r"^(\s*)[-*+]\s+(.*)$")
+QUOTE_PATTERN = re.compile(r"^>\s?(.*)$")
+RULE_PATTERN = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+IDENTIFIER_PATTERN = re.compile(r"\w+")
+
+INLINE_PATTERN = re.compile(
+    r"(?P<code>`(?P<code_text>[^`\n]+)`)"
+    r"|(?P<link>\[(?P<link_text>[^\]\n]+)\]\((?P<link_url>[^()\s]+)\))"
+    r"|(?P<bold>\*\*(?P<bold_text>[^\s*](?:[^\n]*?[^\s*])??)\*\*)"
+    r"|(?P<underline_bold>(?<!\w)__(?P<underline_bold_text>[^\s_](?:[^\n]*?[^\s_])??)__(?!\w))"
+    r"|(?P<strike>~~(?P<strike_text>[^\s~](?:[^\n]*?[^\s~])??)~~)"
+    r"|(?P<italic>(?<![\w*])\*(?P<italic_text>[^\s*](?:[^*\n]*?[^\s*])??)\*(?![\w*]))"
+    r"|(?P<italic_underscore>(?<![\w_])_(?P<italic_underscore_text>[^\s_](?:[^_\n]*?[^\s_])??)_(?![\w_]))"
+)
+
+def escape(text: str) -> str:
+    return SPECIAL_CHARS.sub(r"\\\1", text)
+
+def escape_code(text: str) -> str:
+    return CODE_CHARS.sub(r"\\\1", text)
+
+def escape_url(text: str) -> str:
+    return URL_CHARS.sub(r"\\\1", text)
+
+EMPHASIS = {
+    "bold": "*",
+    "underline_bold": "*",
+    "strike": "~",
+    "italic": "_",
+    "italic_underscore": "_",
+}
+
+def render_inline(text: str, open_markers: Tuple[str, ...] = ()) -> str:
+    parts: List[str] = []
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        parts.append(escape(text[position:match.start()]))
+        position = match.end()
+        kind = match.lastgroup
+        if kind == "code":
+            parts.append(f"`{escape_code(match.group('code_text'))}`")
+        elif kind == "link":
+            parts.append(f"[{render_inline(match.group('link_text'), open_markers)}]({escape_url(match.group('link_url'))})")
+        elif kind == "underline_bold" and IDENTIFIER_PATTERN.fullmatch(match.group("underline_bold_text")):
+            parts.append(escape(match.group(0)))
+        else:
+            marker = EMPHASIS[kind]
+            inner = match.group(f"{kind}_text")
+            if marker in open_markers:
+                parts.append(render_inline(inner, open_markers))
+            else:
+                parts.append(f"{marker}{render_inline(inner, open_markers + (marker,))}{marker}")
+    parts.append(escape(text[position:]))
+    return "".join(parts)
+
+def _render_line(line: str) -> str:
+    heading = HEADING_PATTERN.match(line)
+    if heading:
+        return f"*{render_inline(heading.group(1), ('*',))}*"
+    if RULE_PATTERN.match(line):
+        return escape("──────────")
+    bullet = BULLET_PATTERN.match(line)
+    if bullet:
+        return f"{bullet.group(1)}• {render_inline(bullet.group(2))}"
+    quote = QUOTE_PATTERN.match(line)
+    if quote:
+        return f">{render_inline(quote.group(1))}"
+    return render_inline(line)
+
+def _render_text(text: str) -> str:
+    return "\n".join(_render_line(line) for line in text.split("\n"))
+
+def to_markdown_v2(text: str) -> str:
+    parts: List[str] = []
+    position = 0
+    for match in FENCE_PATTERN.finditer(text):
+        parts.append(_render_text(text[position:match.start()]))
+        language, code = match.group(1), match.group(2).rstrip("\n")
+        parts.append(f"```{language}\n{escape_code(code)}\n```")
+        position = match.end()
+    parts.append(_render_text(text[position:]))
+    return "".join(parts)
+
+TELEGRAM_LIMIT = 4096
+BLOCK_PATTERN = re.compile(r"(```.*?(?:```|\Z))", re.DOTALL)
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+def _split_blocks(text: str) -> List[str]:
+    blocks: List[str] = []
+    for piece in BLOCK_PATTERN.split(text):
+        if not piece.strip():
+            continue
+        if piece.startswith("```"):
+            blocks.append(piece.strip("\n"))
+        else:
+            blocks.extend(p.strip("\n") for p in re.split(r"\n\s*\n", piece) if p.strip())
+    return blocks
+
+def rendered_length(text: str) -> int:
+    return len(to_markdown_v2(text))
+
+def _hard_split(text: str, limit: int, measure=rendered_length) -> List[str]:
+    chunks: List[str] = []
+    while measure(text) > limit:
+        low, high = 1, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if measure(text[:middle]) <= limit:
+                low = middle
+            else:
+                high = middle - 1
+        cut = text.rfind(" ", 0, low)
+        if cut <= low // 2:
+            cut = low
+        chunks.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text:
+        chunks.append(text)
+    return chunks
+
+def _pack(pieces: List[str], limit: int, separator: str, measure=rendered_length) -> List[str]:
+    parts: List[str] = []
+    current: List[str] = []
+    size = 0
+    for piece in pieces:
+        piece_size = measure(piece)
+        candidate = size + len(separator) + piece_size if current else piece_size
+        if candidate <= limit:
+            current.append(piece)
+            size = candidate
+            continue
+        if current:
+            parts.append(separator.join(current))
+        current, size = [piece], piece_size
+    if current:
+        parts.append(separator.join(current))
+    return parts
+
+def _code_length(line: str) -> int:
+    return len(escape_code(line))
+
+def _split_code_block(block: str, limit: int) -> List[str]:
+    match = FENCE_PATTERN.match(block)
+    language, code = (match.group(1), match.group(2).rstrip("\n")) if match else ("", block)
+    budget = limit - len(language) - 8
+    lines: List[str] = []
+    for line in code.split("\n"):
+        lines.extend(_hard_split(line, budget, _code_length) if _code_length(line) > budget else [line])
+    return [f"```{language}\n{chunk}\n```" for chunk in _pack(lines, budget, "\n", _code_length)]
+
+def _split_paragraph(block: str, limit: int) -> List[str]:
+    pieces: List[str] = []
+    for line in block.split("\n"):
+        if rendered_length(line) <= limit:
+            pieces.append(line)
+            continue
+        for sentence in SENTENCE_BREAK.split(line):
+            pieces.extend(_hard_split(sentence, limit) if rendered_length(sentence) > limit else [sentence])
+    return _pack(pieces, limit, "\n")
+
+def split_message(text: str, limit: int = TELEGRAM_LIMIT) -> List[str]:
+    if rendered_length(text) <= limit:
+        return [text]
+    pieces: List[str] = []
+    for block in _split_blocks(text):
+        if rendered_length(block) <= limit:
+            pieces.append(block)
+        elif block.startswith("```"):
+            pieces.extend(_split_code_block(block, limit))
+        else:
+            pieces.extend(_split_paragraph(block, limit))
+    return _pack(pieces, limit, "\n\n")
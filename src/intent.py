@@ -0,0 +1,179 @@
+import logging
+import math
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Any, Optional, List, Tuple
+from src import config, db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_FAST_LABELS = [
+    "answer_directly",
+    "search_and_answer",
+    "specialist:reason",
+    "specialist:creative",
+    "specialist:code",
+]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+SMALL_TALK_PATTERN = re.compile(
+    r"^\s*(hi|hii+|hello|hey|yo|sup|gm|gn|good (morning|afternoon|evening|night)|"
+    r"thanks|thank you|thx|ty|ok|okay|k|cool|nice|great|awesome|perfect|got it|bye|see you|lol|haha)"
+    r"[\s!.,🙂😊👍🙏]*$",
+    re.IGNORECASE,
+)
+FEATURE_PATTERNS = {
+    "__question__": re.compile(r"\?\s*$"),
+    "__url__": re.compile(r"https?://|www\."),
+    "__code__": re.compile(r"```|def |class |function |=>|;\s*$|\{\s*$|traceback|exception", re.IGNORECASE),
+    "__time__": re.compile(r"\b(today|tonight|latest|current|now|202\d|news|price|weather|score)\b", re.IGNORECASE),
+}
+
+class Prediction:
+    def __init__(self, label: str, confidence: float, source: str):
+        self.label = label
+        self.confidence = confidence
+        self.source = source
+
+    def to_decision(self, message: str) -> Dict[str, Any]:
+        action, _, specialist = self.label.partition(":")
+        return {
+            "action": action,
+            "confidence": "high",
+            "search_query": message if action in ("search_and_answer", "search_only") else None,
+            "fetch_full_page": False,
+            "specialist": specialist or None,
+            "capability": "chat",
+            "reasoning": f"Local classifier ({self.source}, p={self.confidence:.2f})",
+            "response": None,
+            "source": "classifier",
+        }
+
+def label_for(decision: Dict[str, Any]) -> str:
+    action = decision.get("action", "answer_directly")
+    specialist = decision.get("specialist")
+    if action == "specialist" and specialist:
+        return f"specialist:{specialist}"
+    return action
+
+def extract_features(message: str) -> List[str]:
+    lowered = message.lower()
+    tokens = TOKEN_PATTERN.findall(lowered)
+    features = tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+    for name, pattern in FEATURE_PATTERNS.items():
+        if pattern.search(message):
+            features.append(name)
+    length = len(tokens)
+    features.append("__len_short__" if length <= 4 else "__len_medium__" if length <= 20 else "__len_long__")
+    return features
+
+class NaiveBayesClassifier:
+    def __init__(self):
+        self.label_counts: Counter = Counter()
+        self.feature_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.feature_totals: Counter = Counter()
+        self.vocabulary: set = set()
+        self.samples = 0
+
+    def fit(self, rows: List[Tuple[str, str]]):
+        self.__init__()
+        for message, label in rows:
+            features = extract_features(message)
+            self.label_counts[label] += 1
+            self.feature_counts[label].update(features)
+            self.feature_totals[label] += len(features)
+            self.vocabulary.update(features)
+            self.samples += 1
+
+    def predict(self, message: str) -> Optional[Tuple[str, float]]:
+        if not self.samples:
+            return None
+        features = [f for f in extract_features(message) if f in self.vocabulary]
+        if not features:
+            return None
+        vocab_size = len(self.vocabulary)
+        scores = {}
+        for label, count in self.label_counts.items():
+            score = math.log(count / self.samples)
+            denominator = self.feature_totals[label] + vocab_size
+            label_features = self.feature_counts[label]
+            for feature in features:
+                score += math.log((label_features[feature] + 1) / denominator)
+            scores[label] = score
+        best = max(scores, key=scores.get)
+        peak = scores[best]
+        total = sum(math.exp(score - peak) for score in scores.values())
+        return best, 1.0 / total
+
+model = NaiveBayesClassifier()
+trained_at = 0.0
+shadow_stats: Counter = Counter()
+
+def _settings() -> Dict[str, Any]:
+    return config.BOT_CONFIG.get("intent_classifier", {})
+
+def enabled() -> bool:
+    return _settings().get("enabled", False)
+
+def mode() -> str:
+    return _settings().get("mode", "shadow")
+
+def predict(message: str) -> Optional[Prediction]:
+    if not enabled() or not message:
+        return None
+    if SMALL_TALK_PATTERN.match(message):
+        return Prediction("answer_directly", 0.99, "rules")
+    result = model.predict(message)
+    if result is None or model.samples < _settings().get("min_training_samples", 50):
+        return None
+    label, confidence = result
+    if label not in _settings().get("fast_labels", DEFAULT_FAST_LABELS):
+        return None
+    return Prediction(label, confidence, "model")
+
+def should_shortcut(prediction: Optional[Prediction]) -> bool:
+    if prediction is None or mode() != "active":
+        return False
+    return prediction.confidence >= _settings().get("threshold", DEFAULT_THRESHOLD)
+
+def record_shadow(message: str, prediction: Optional[Prediction], decision: Dict[str, Any]):
+    if prediction is None:
+        return
+    brain_label = label_for(decision)
+    agreed = prediction.label == brain_label
+    confident = prediction.confidence >= _settings().get("threshold", DEFAULT_THRESHOLD)
+    shadow_stats["total"] += 1
+    shadow_stats["agree"] += int(agreed)
+    if confident:
+        shadow_stats["confident"] += 1
+        shadow_stats["confident_agree"] += int(agreed)
+    logger.info(
+        f"Intent shadow: local={prediction.label} p={prediction.confidence:.2f} ({prediction.source}) "
+        f"brain={brain_label} agree={agreed}"
+    )
+
+def get_stats() -> Dict[str, Any]:
+    return {
+        "mode": mode() if enabled() else "off",
+        "samples": model.samples,
+        "trained_at": trained_at,
+        "shadow_total": shadow_stats["total"],
+        "shadow_agree": shadow_stats["agree"],
+        "confident": shadow_stats["confident"],
+        "confident_agree": shadow_stats["confident_agree"],
+    }
+
+async def train():
+    global trained_at
+    if not enabled():
+        return
+    try:
+        rows = await db.get_logged_decisions(_settings().get("max_training_rows", 5000))
+    except Exception as e:
+        logger.warning(f"Intent classifier training skipped: {e}")
+        return
+    model.fit([(r["input"], r["command"]) for r in rows if r.get("input")])
+    trained_at = time.time()
+    logger.info(f"Intent classifier trained on {model.samples} logged decisions ({len(model.label_counts)} labels)")
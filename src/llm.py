@@ -22,6 +22,6 @@ async def summarize_with_llm(prompt: str) -> str:
         model = classifier_model
     
     try:
-        return await providers.call_with_fallback(f"{provider}/{model}", messages)
+        return await providers.call_with_fallback(f"{provider}/{model}", messages, cache=True)
     except Exception as e:
         return f"Summary error: {str(e)}"
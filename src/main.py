@@ -3,7 +3,7 @@ import logging
 from aiohttp import web
 from telegram import Bot, Update
 from telegram.error import TelegramError
-from src import config, db, scheduler, bot as bot_module
+from src import config, db, scheduler, providers, summarizer, intent, updates, chat_queue, outbox, bot as bot_module
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,9 +15,14 @@ async def webhook_handler(request):
     bot = request.app["bot"]
     try:
         update = Update.de_json(await request.json(), bot)
-        await request.app["application"].process_update(update)
     except Exception as e:
         logger.error(f"Webhook error: {e}")
+        return web.Response(text="Bad Request", status=400)
+    if update is None:
+        return web.Response(text="Bad Request", status=400)
+
+    if not updates.submit(update):
+        return web.Response(text="Busy", status=503)
     return web.Response(text="OK", status=200)
 
 async def register_webhook(bot: Bot):
@@ -58,9 +63,27 @@ async def on_startup(app):
     await db.init_db()
     logger.info("Database initialized")
     
+    await providers.init_clients()
+    logger.info("Provider HTTP clients opened")
+    
+    await summarizer.start()
+    logger.info("History summarizer started")
+    
     await scheduler.init_scheduler()
     logger.info("Scheduler initialized")
     
+    flush_interval = config.BOT_CONFIG.get("session_cache", {}).get("flush_interval", 30)
+    scheduler.add_interval_job(db.flush_session_counts, flush_interval, "session_count_flush")
+    
+    retention = config.BOT_CONFIG.get("history_retention", {})
+    if retention.get("enabled", True):
+        scheduler.add_interval_job(summarizer.compact_history, retention.get("interval", 900), "history_compaction")
+    
+    if intent.enabled():
+        await intent.train()
+        retrain_interval = config.BOT_CONFIG.get("intent_classifier", {}).get("retrain_interval", 3600)
+        scheduler.add_interval_job(intent.train, retrain_interval, "intent_retrain")
+    
     app["application"] = bot_module.setup_bot()
     await app["application"].initialize()
     
@@ -72,16 +95,24 @@ async def on_startup(app):
     await register_commands(bot)
     
     await app["application"].start()
+    outbox.start(bot)
+    updates.start(app["application"])
     #await bot.delete_webhook(drop_pending_updates=True)
     logger.info("Bot started and webhook registered")
 
 async def on_shutdown(app):
     logger.info("Shutting down...")
     
+    await updates.stop()
+    await chat_queue.stop()
+    await outbox.stop()
+    
     if "application" in app:
         await app["application"].stop()
     
     await scheduler.shutdown_scheduler()
+    await summarizer.stop()
+    await providers.close_clients()
     await db.close_db()
     
     logger.info("Shutdown complete")
@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import logging
+from typing import Tuple
+import aiomysql
+from src import config, sqlite_backend
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+TABLES = {
+    "conversation_history": ("id", "chat_id", "role", "content", "needs_summary", "is_summary", "timestamp"),
+    "reminders": ("id", "chat_id", "message", "remind_at", "created_at"),
+    "command_logs": ("id", "chat_id", "command", "output", "input", "created_at"),
+    "sessions": ("id", "chat_id", "model_override", "agent_override", "message_count", "updated_at"),
+    "notes": ("id", "chat_id", "content", "tags", "created_at", "embedding", "embedding_model"),
+    "shortcuts": ("id", "chat_id", "`trigger`", "expansion", "created_at"),
+    "llm_cache": ("cache_key", "response", "expires_at"),
+    "destroy_log": ("id", "attempt_at", "success"),
+}
+
+async def _target_is_empty(target) -> bool:
+    async with target.acquire() as conn:
+        async with conn.cursor() as cur:
+            for table in TABLES:
+                await cur.execute(f"SELECT COUNT(*) FROM {table}")
+                row = await cur.fetchone()
+                if row[0]:
+                    return False
+    return True
+
+async def _copy_table(source, target, table: str, columns: Tuple[str, ...], batch_size: int) -> int:
+    key = columns[0]
+    column_list = ", ".join(columns)
+    insert = f"INSERT INTO {table} ({column_list}) VALUES ({', '.join(['%s'] * len(columns))})"
+    copied = 0
+    last_key = None
+    while True:
+        async with source.acquire() as conn:
+            async with conn.cursor() as cur:
+                if last_key is None:
+                    await cur.execute(f"SELECT {column_list} FROM {table} ORDER BY {key} LIMIT %s", (batch_size,))
+                else:
+                    await cur.execute(
+                        f"SELECT {column_list} FROM {table} WHERE {key} > %s ORDER BY {key} LIMIT %s",
+                        (last_key, batch_size)
+                    )
+                rows = await cur.fetchall()
+        if not rows:
+            return copied
+        async with target.acquire() as conn:
+            await conn.begin()
+            async with conn.cursor() as cur:
+                await cur.executemany(insert, rows)
+            await conn.commit()
+        copied += len(rows)
+        last_key = rows[-1][0]
+
+async def migrate(path: str, batch_size: int):
+    source = await aiomysql.create_pool(
+        host=config.MYSQL_HOST,
+        port=config.MYSQL_PORT,
+        user=config.MYSQL_USER,
+        password=config.MYSQL_PASSWORD,
+        db=config.MYSQL_DB,
+        autocommit=True,
+        minsize=1,
+        maxsize=1,
+    )
+    target = await sqlite_backend.create_pool(path, size=1)
+    try:
+        await sqlite_backend.create_tables(target)
+        if not await _target_is_empty(target):
+            raise SystemExit(f"{path} already contains data; migrate into a new file")
+        for table, columns in TABLES.items():
+            copied = await _copy_table(source, target, table, columns, batch_size)
+            logger.info(f"Copied {copied} rows from {table}")
+    finally:
+        source.close()
+        await source.wait_closed()
+        target.close()
+        await target.wait_closed()
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy the MySQL database into a new SQLite file")
+    parser.add_argument("--path", default=config.SQLITE_PATH, help="SQLite file to create")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+    asyncio.run(migrate(args.path, args.batch_size))
+    logger.info(f"Migration complete. Set DB_BACKEND=sqlite and SQLITE_PATH={args.path} to use it.")
+
+if __name__ == "__main__":
+    main()
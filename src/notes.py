@@ -1,14 +1,17 @@
 from typing import List, Optional
-from src import db
+from src import db, vectors
 
 async def add_note(chat_id: int, content: str, tags: Optional[str] = None) -> int:
-    return await db.add_note(chat_id, content, tags)
+    note_id = await db.add_note(chat_id, content, tags)
+    await vectors.index_note(chat_id, note_id, content, tags)
+    return note_id
 
 async def get_notes(chat_id: int) -> List[dict]:
     return await db.get_notes(chat_id)
 
 async def delete_note(chat_id: int, note_id: int):
     await db.delete_note(note_id, chat_id)
+    vectors.remove_note(chat_id, note_id)
 
-async def search_notes(chat_id: int, query: str) -> List[dict]:
-    return await db.search_notes(chat_id, query)
+async def search_notes(chat_id: int, query: str, limit: int = 10, offset: int = 0) -> List[dict]:
+    return await db.search_notes(chat_id, query, limit, offset)
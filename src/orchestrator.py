@@ -1,10 +1,18 @@
 import logging
-from typing import Dict, Any, Optional, List, Union
-from src import brain, search, browser, db, config, providers
+import time
+from typing import Dict, Any, Optional, List, Union, Callable, Awaitable
+from src import brain, search, db, config, providers, intent, outbox, formatter, vectors, turn as turn_context
+from src.turn import TurnContext
 
 logger = logging.getLogger(__name__)
 
 MAX_RESPONSE_CHARS = 4000
+NOTES_TOP_K = 8
+STREAM_EDIT_INTERVAL = 1.5
+STREAM_PREVIEW_CHARS = 4000
+STREAM_CURSOR = " ▌"
+
+StreamCallback = Callable[[str], Awaitable[None]]
 
 STATUS_TEXTS = {
     "answer_directly":   "💭 Thinking...",
@@ -24,16 +32,57 @@ STATUS_TEXTS = {
 
 async def _update_status(bot, chat_id: int, message_id: int, text: str):
     if bot and message_id:
-        try:
-            await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text)
-        except Exception:
-            pass
+        outbox.update_status(chat_id, message_id, text)
+
+class StreamEditor:
+    def __init__(self, bot, chat_id: int, message_id: int, interval: float = STREAM_EDIT_INTERVAL):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.interval = interval
+        self.last_edit = 0.0
+        self.last_text = ""
+
+    async def __call__(self, text: str):
+        now = time.monotonic()
+        if now - self.last_edit < self.interval or not text.strip() or text == self.last_text:
+            return
+        self.last_edit = now
+        self.last_text = text
+        preview = text[:STREAM_PREVIEW_CHARS] + STREAM_CURSOR
+        await _update_status(self.bot, self.chat_id, self.message_id, preview)
+
+def _make_stream_callback(bot, chat_id: int, message_id: Optional[int]) -> Optional[StreamCallback]:
+    settings = config.BOT_CONFIG.get("settings", {})
+    if not settings.get("streaming", False) or not bot or not message_id:
+        return None
+    return StreamEditor(bot, chat_id, message_id, settings.get("stream_edit_interval", STREAM_EDIT_INTERVAL))
 
-async def execute(chat_id: int, message: str, media: Optional[Dict[str, Any]] = None, bot=None, status_message_id: Optional[int] = None) -> Union[str, List[str]]:
+async def _complete(provider_model: str, messages: List[Dict[str, str]], fallback=None, status_callback=None, stream_callback: Optional[StreamCallback] = None) -> str:
+    if not stream_callback:
+        return await providers.call_with_fallback(provider_model, messages, fallback, status_callback=status_callback)
+    
+    chunks: List[str] = []
+    try:
+        async for chunk in providers.stream_with_fallback(provider_model, messages, fallback):
+            chunks.append(chunk)
+            await stream_callback("".join(chunks))
+    except providers.ProviderError as e:
+        if chunks:
+            raise
+        logger.warning(f"Streaming unavailable, falling back to blocking call: {e}")
+    
+    if not chunks:
+        return await providers.call_with_fallback(provider_model, messages, fallback, status_callback=status_callback)
+    return "".join(chunks)
+
+async def execute(chat_id: int, message: str, media: Optional[Dict[str, Any]] = None, bot=None, status_message_id: Optional[int] = None, turn: Optional[TurnContext] = None) -> Union[str, List[str]]:
     async def status_callback(text: str):
         await _update_status(bot, chat_id, status_message_id, text)
 
-    decision = await brain.decide(chat_id, message, media)
+    stream_callback = _make_stream_callback(bot, chat_id, status_message_id)
+
+    decision = await brain.decide(chat_id, message, media, turn)
     
     action = decision.get("action", "answer_directly")
     confidence = decision.get("confidence", "high")
@@ -43,6 +92,7 @@ async def execute(chat_id: int, message: str, media: Optional[Dict[str, Any]] =
     capability = decision.get("capability", "chat")
     reasoning = decision.get("reasoning", "")
     direct_response = decision.get("response")
+    single_pass = decision.get("single_pass", False)
 
     logger.info(f"Orchestrator: action={action}, specialist={specialist}, confidence={confidence}")
 
@@ -51,65 +101,67 @@ async def execute(chat_id: int, message: str, media: Optional[Dict[str, Any]] =
         action_status = STATUS_TEXTS.get("specialist", {}).get(specialist, "💭 Thinking...")
     await _update_status(bot, chat_id, status_message_id, action_status)
 
-    await db.log_command(chat_id, action, reasoning)
+    training_input = message if decision.get("source") == "brain" and not media else None
+    await turn_context.log_command(chat_id, intent.label_for(decision), reasoning, training_input, turn)
 
     if action == "answer_directly":
         if direct_response:
             response = direct_response
+        elif single_pass:
+            response = brain.SINGLE_PASS_FALLBACK
         else:
-            response = await ask_brain_directly(chat_id, message)
+            response = await ask_brain_directly(chat_id, message, status_callback, stream_callback, turn)
         
         if confidence == "low":
             web_result = await quick_verify(message)
             if web_result:
                 response += f"\n\n[Verified via web: {web_result[:200]}]"
         
-        await db.add_message(chat_id, "user", message)
-        await db.add_message(chat_id, "assistant", response)
-        return truncate_response(response)
+        await turn_context.save_exchange(chat_id, message, response, turn)
+        return split_response(response)
 
     elif action == "search_and_answer":
         if not search_query:
             search_query = message
         
-        if fetch_full_page:
-            search_results = await search.search_web(search_query, max_results=1)
-            if search_results and "error" not in search_results.lower() and "no results" not in search_results.lower():
-                top_url = await extract_top_url(search_query)
-                if top_url:
-                    full_content = await browser.browse_url(top_url)
-                    response = await synthesize_with_context(chat_id, message, search_results, full_content, status_callback)
-                else:
-                    response = await synthesize_with_context(chat_id, message, search_results, None, status_callback)
-            else:
-                response = search_results
-        else:
-            search_results = await search.search_web(search_query)
-            response = await synthesize_with_context(chat_id, message, search_results, None, status_callback)
-        
-        return truncate_response(response)
+        try:
+            results = await retrieve(search_query, fetch_full_page)
+        except Exception as e:
+            return split_response(f"Search error: {str(e)}")
+        if not results:
+            return split_response("No results found.")
+
+        response = await synthesize_with_context(chat_id, message, search.format_results(results), status_callback, turn)
+        return split_response(response)
 
     elif action == "search_only":
         if not search_query:
             search_query = message
-        results = await search.search_web(search_query)
-        return truncate_response(results)
+        try:
+            results = await search.search_raw(search_query)
+        except Exception as e:
+            return split_response(f"Search error: {str(e)}")
+        if not results:
+            return split_response("No results found.")
+        return split_response(search.format_results(results, include_content=False))
 
     elif action == "specialist":
         if not specialist:
             specialist = "default"
-        response = await call_specialist(chat_id, message, str(specialist), status_callback)
-        return truncate_response(response)
+        response = await call_specialist(chat_id, message, str(specialist), status_callback, stream_callback, turn)
+        return split_response(response)
 
     elif action == "multi_step":
         if not search_query or not specialist:
-            return truncate_response("Multi-step requires both search_query and specialist.")
+            return split_response("Multi-step requires both search_query and specialist.")
         
-        search_results = await search.search_web(search_query)
-        if not specialist:
-            specialist = "default"
-        response = await call_specialist_with_context(chat_id, message, str(specialist), search_results, status_callback)
-        return truncate_response(response)
+        try:
+            results = await retrieve(search_query)
+        except Exception as e:
+            return split_response(f"Search error: {str(e)}")
+        search_results = search.format_results(results) if results else "No results found."
+        response = await call_specialist_with_context(chat_id, message, str(specialist), search_results, status_callback, turn)
+        return split_response(response)
 
     elif action == "transcribe":
         if not media or media.get("type") != "voice":
@@ -129,14 +181,13 @@ async def execute(chat_id: int, message: str, media: Optional[Dict[str, Any]] =
             message=transcript,
             media=None,
             bot=bot,
-            status_message_id=status_message_id
+            status_message_id=status_message_id,
+            turn=turn
         )
 
         if isinstance(response, list):
-            response[0] = f"🎙️ {transcript}\n\n{response[0]}"
-        else:
-            response = f"🎙️ {transcript}\n\n{response}"
-        return response
+            return [f"🎙️ {transcript}", *response]
+        return split_response(f"🎙️ {transcript}\n\n{response}")
 
     elif action == "vision":
         if not media or media.get("type") != "image":
@@ -145,22 +196,24 @@ async def execute(chat_id: int, message: str, media: Optional[Dict[str, Any]] =
         if not file_data or not isinstance(file_data, bytes):
             return "No valid image file provided."
         response = await analyze_image(file_data, message)
-        return truncate_response(response)
+        return split_response(response)
 
     elif action == "embeddings_search":
         response = await search_notes(chat_id, message, status_callback)
-        return truncate_response(response)
+        return split_response(response)
 
     elif action == "code_fim":
         response = await code_completion(chat_id, message, status_callback)
-        return truncate_response(response)
+        return split_response(response)
 
     else:
         if direct_response:
-            return truncate_response(direct_response)
-        return await ask_brain_directly(chat_id, message, status_callback)
+            return split_response(direct_response)
+        if single_pass:
+            return split_response(brain.SINGLE_PASS_FALLBACK)
+        return await ask_brain_directly(chat_id, message, status_callback, stream_callback, turn)
 
-async def ask_brain_directly(chat_id: int, message: str, status_callback=None) -> str:
+async def ask_brain_directly(chat_id: int, message: str, status_callback=None, stream_callback: Optional[StreamCallback] = None, turn: Optional[TurnContext] = None) -> str:
     brain_config = config.BOT_CONFIG.get("brain", {})
     provider = brain_config.get("provider", "google")
     model = brain_config.get("model", "gemini-2.5-flash")
@@ -169,7 +222,7 @@ async def ask_brain_directly(chat_id: int, message: str, status_callback=None) -
         "openrouter/mistralai/mistral-7b-instruct:free"
     ]
     
-    history = await db.get_conversation_history(chat_id)
+    history = await turn_context.get_history(chat_id, turn)
     messages = [
         {"role": "system", "content": config.BOT_SETTINGS.get("personality", "You are PicoClaw.")},
     ]
@@ -177,29 +230,22 @@ async def ask_brain_directly(chat_id: int, message: str, status_callback=None) -
         messages.append({"role": msg["role"], "content": msg["content"]})
     messages.append({"role": "user", "content": message})
     
-    return await providers.call_with_fallback(f"{provider}/{model}", messages, fallback, status_callback=status_callback)
+    return await _complete(f"{provider}/{model}", messages, fallback, status_callback, stream_callback)
 
 async def quick_verify(query: str) -> str:
     try:
-        result = await search.search_web(query, max_results=1)
-        return result[:300] if result else ""
+        results = await search.search_raw(query, max_results=1)
+        return search.format_results(results)[:300] if results else ""
     except Exception:
         return ""
 
-async def extract_top_url(query: str) -> str:
-    try:
-        from ddgs import DDGS
-        import asyncio
-        ddgs = DDGS()
-        results = await asyncio.to_thread(ddgs.text, query, max_results=1)
-        if results and len(results) > 0:
-            return results[0].get("href", "")
-    except Exception:
-        pass
-    return ""
+async def retrieve(query: str, fetch_full_page: bool = False) -> List[Dict[str, Any]]:
+    settings = config.BOT_CONFIG.get("retrieval", {})
+    fetch_pages = settings.get("fetch_pages", 1) if fetch_full_page else 0
+    return await search.retrieve(query, max_results=settings.get("max_results", 3), fetch_pages=fetch_pages)
 
-async def synthesize_with_context(chat_id: int, original_message: str, search_results: str, full_content: Optional[str], status_callback=None) -> str:
-    session = await db.get_session(chat_id)
+async def synthesize_with_context(chat_id: int, original_message: str, search_results: str, status_callback=None, turn: Optional[TurnContext] = None) -> str:
+    session = await turn_context.get_session(chat_id, turn)
     brain_config = config.BOT_CONFIG.get("brain", {})
     
     if session.get("model_override"):
@@ -214,16 +260,12 @@ async def synthesize_with_context(chat_id: int, original_message: str, search_re
         "openrouter/mistralai/mistral-7b-instruct:free"
     ]
     
-    context_content = search_results
-    if full_content:
-        context_content += f"\n\nFull page content:\n{full_content[:3000]}"
-
     prompt = f"""Based on the user's question and web search results, provide a concise answer.
 
 User question: {original_message}
 
 Web search results:
-{context_content}
+{search_results}
 
 Provide a direct, concise answer."""
 
@@ -234,14 +276,13 @@ Provide a direct, concise answer."""
 
     try:
         response = await providers.call_with_fallback(provider_model, messages, fallback, status_callback=status_callback)
-        await db.add_message(chat_id, "user", original_message)
-        await db.add_message(chat_id, "assistant", response)
+        await turn_context.save_exchange(chat_id, original_message, response, turn)
         return response
     except Exception as e:
         return f"Error synthesizing answer: {str(e)}"
 
-async def call_specialist(chat_id: int, message: str, specialist: str, status_callback=None) -> str:
-    session = await db.get_session(chat_id)
+async def call_specialist(chat_id: int, message: str, specialist: str, status_callback=None, stream_callback: Optional[StreamCallback] = None, turn: Optional[TurnContext] = None) -> str:
+    session = await turn_context.get_session(chat_id, turn)
     
     agent_config = config.get_agent_config(specialist) or config.get_agent_config("default") or {}
     fallback = agent_config.get("fallback")
@@ -259,15 +300,14 @@ async def call_specialist(chat_id: int, message: str, specialist: str, status_ca
     ]
 
     try:
-        response = await providers.call_with_fallback(provider_model, messages, fallback, status_callback=status_callback)
-        await db.add_message(chat_id, "user", message)
-        await db.add_message(chat_id, "assistant", response)
+        response = await _complete(provider_model, messages, fallback, status_callback, stream_callback)
+        await turn_context.save_exchange(chat_id, message, response, turn)
         return response
     except Exception as e:
         return f"Error: {str(e)}"
 
-async def call_specialist_with_context(chat_id: int, message: str, specialist: str, context: str, status_callback=None) -> str:
-    session = await db.get_session(chat_id)
+async def call_specialist_with_context(chat_id: int, message: str, specialist: str, context: str, status_callback=None, turn: Optional[TurnContext] = None) -> str:
+    session = await turn_context.get_session(chat_id, turn)
     
     agent_config = config.get_agent_config(specialist) or config.get_agent_config("default") or {}
     fallback = agent_config.get("fallback")
@@ -294,8 +334,7 @@ Search results:
 
     try:
         response = await providers.call_with_fallback(provider_model, messages, fallback, status_callback=status_callback)
-        await db.add_message(chat_id, "user", message)
-        await db.add_message(chat_id, "assistant", response)
+        await turn_context.save_exchange(chat_id, message, response, turn)
         return response
     except Exception as e:
         return f"Error: {str(e)}"
@@ -325,11 +364,18 @@ async def analyze_image(image_bytes: Optional[bytes], prompt: str) -> str:
 
 async def search_notes(chat_id: int, query: str, status_callback=None) -> str:
     try:
-        notes = await db.get_notes(chat_id)
+        top_k = config.BOT_CONFIG.get("notes_search", {}).get("top_k", NOTES_TOP_K)
+        notes = []
+        try:
+            notes = await vectors.search(chat_id, query, top_k)
+        except Exception as e:
+            logger.warning(f"Vector note search failed, using full-text search: {e}")
+        if not notes:
+            notes = await db.search_notes(chat_id, query, limit=top_k)
         if not notes:
-            return "No notes found. Use /note to save notes."
+            return "No matching notes found. Use /notes to list them or /note to save one."
         
-        notes_text = "\n".join([f"- {n.get('content', '')}" for n in notes[:20]])
+        notes_text = "\n".join([f"- {n.get('content', '')}" for n in notes])
         
         messages = [
             {"role": "system", "content": "You search through user's notes to find relevant information."},
@@ -352,14 +398,14 @@ async def code_completion(chat_id: int, prompt: str, status_callback=None) -> st
     except Exception as e:
         return f"Code completion error: {str(e)}"
 
-def truncate_response(response: str) -> str:
+def split_response(response: str) -> Union[str, List[str]]:
     if not response:
         return "No response."
     
     settings = config.BOT_CONFIG.get("settings", {})
-    max_chars = settings.get("max_response_chars", MAX_RESPONSE_CHARS)
+    max_chars = min(settings.get("max_response_chars", MAX_RESPONSE_CHARS), formatter.TELEGRAM_LIMIT)
     
-    if len(response) <= max_chars:
+    if formatter.rendered_length(response) <= max_chars:
         return response
     
-    return response[:max_chars-100] + "\n\n[Truncated...]"
+    return formatter.split_message(response, max_chars)
@@ -0,0 +1,266 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Any, List, Optional, Tuple, Union
+from telegram.error import BadRequest, RetryAfter
+from src import config, formatter
+from src.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GLOBAL_PER_SECOND = 30
+DEFAULT_CHAT_PER_MINUTE = 60
+DEFAULT_CHAT_BURST = 3
+DEFAULT_GROUP_PER_MINUTE = 20
+DEFAULT_LOW_PRIORITY_RESERVE = 5
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_REMINDER_BATCH_WAIT = 1.0
+
+bot = None
+global_bucket: Optional[TokenBucket] = None
+chat_buckets: Dict[int, TokenBucket] = {}
+pending_status: Dict[Tuple[int, int], str] = {}
+status_tasks: Dict[Tuple[int, int], asyncio.Task] = {}
+status_in_flight: set = set()
+reminder_queue: Optional[asyncio.Queue] = None
+reminder_worker: Optional[asyncio.Task] = None
+stats: Dict[str, int] = {"sent": 0, "edited": 0, "coalesced": 0, "retry_after": 0}
+
+def _settings() -> Dict[str, Any]:
+    return config.BOT_CONFIG.get("outbox", {})
+
+def _get_bot():
+    if bot is None:
+        raise RuntimeError("Outbox not started")
+    return bot
+
+def _global_bucket() -> TokenBucket:
+    global global_bucket
+    if global_bucket is None:
+        per_second = _settings().get("global_per_second", DEFAULT_GLOBAL_PER_SECOND)
+        global_bucket = TokenBucket(per_second * 60, per_second)
+    return global_bucket
+
+def _chat_bucket(chat_id: int) -> TokenBucket:
+    bucket = chat_buckets.get(chat_id)
+    if bucket is None:
+        if chat_id < 0:
+            per_minute = _settings().get("group_per_minute", DEFAULT_GROUP_PER_MINUTE)
+        else:
+            per_minute = _settings().get("chat_per_minute", DEFAULT_CHAT_PER_MINUTE)
+        bucket = TokenBucket(per_minute, _settings().get("chat_burst", DEFAULT_CHAT_BURST))
+        chat_buckets[chat_id] = bucket
+    return bucket
+
+async def _acquire(chat_id: int, priority: bool = True):
+    chat_bucket = _chat_bucket(chat_id)
+    shared = _global_bucket()
+    reserve = 0 if priority else _settings().get("low_priority_reserve", DEFAULT_LOW_PRIORITY_RESERVE)
+    while True:
+        if chat_bucket.headroom() >= 1.0 and shared.headroom() >= 1.0 + reserve:
+            chat_bucket.take()
+            shared.take()
+            return
+        await asyncio.sleep(max(chat_bucket.wait_time(), shared.wait_time(), 0.05))
+
+def _retry_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+async def _call(chat_id: int, method: str, priority: bool = True, **kwargs):
+    max_retries = _settings().get("max_retries", DEFAULT_MAX_RETRIES)
+    for attempt in range(max_retries + 1):
+        await _acquire(chat_id, priority)
+        try:
+            return await getattr(_get_bot(), method)(chat_id=chat_id, **kwargs)
+        except RetryAfter as e:
+            stats["retry_after"] += 1
+            delay = _retry_seconds(e)
+            _chat_bucket(chat_id).cool_down(delay)
+            logger.warning(f"Telegram flood control on chat {chat_id}, retry in {delay:.1f}s")
+            if attempt == max_retries:
+                raise
+
+async def send_message(chat_id: int, text: str, parse_mode: Optional[str] = None, **kwargs):
+    message = await _call(chat_id, "send_message", text=text, parse_mode=parse_mode, **kwargs)
+    stats["sent"] += 1
+    return message
+
+async def edit_message(chat_id: int, message_id: int, text: str, parse_mode: Optional[str] = None):
+    await discard_status(chat_id, message_id)
+    result = await _call(chat_id, "edit_message_text", message_id=message_id, text=text, parse_mode=parse_mode)
+    stats["edited"] += 1
+    return result
+
+async def delete_message(chat_id: int, message_id: int) -> bool:
+    await discard_status(chat_id, message_id)
+    try:
+        return await _call(chat_id, "delete_message", message_id=message_id)
+    except Exception:
+        return False
+
+async def _send_formatted(chat_id: int, text: str, status_message_id: Optional[int] = None):
+    rendered = formatter.to_markdown_v2(text)
+    if status_message_id:
+        try:
+            await edit_message(chat_id, status_message_id, rendered, parse_mode=formatter.PARSE_MODE)
+            return
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                return
+            logger.warning(f"Formatted edit rejected for chat {chat_id}, using plain text: {e}")
+            try:
+                await edit_message(chat_id, status_message_id, text)
+                return
+            except Exception:
+                await delete_message(chat_id, status_message_id)
+        except Exception:
+            await delete_message(chat_id, status_message_id)
+    try:
+        await send_message(chat_id, rendered, parse_mode=formatter.PARSE_MODE)
+    except BadRequest as e:
+        logger.warning(f"Formatted send rejected for chat {chat_id}, using plain text: {e}")
+        await send_message(chat_id, text)
+
+async def send_reply(chat_id: int, response: Union[str, List[str]], status_message_id: Optional[int] = None):
+    parts = response if isinstance(response, list) else [response]
+    parts = [piece for part in parts if part and part.strip() for piece in formatter.split_message(part)] or ["No response."]
+    await _send_formatted(chat_id, parts[0], status_message_id)
+    for part in parts[1:]:
+        await _send_formatted(chat_id, part)
+
+async def send_chat_action(chat_id: int, action: str):
+    try:
+        await _call(chat_id, "send_chat_action", priority=False, action=action)
+    except Exception:
+        pass
+
+def update_status(chat_id: int, message_id: int, text: str):
+    key = (chat_id, message_id)
+    if key in pending_status:
+        stats["coalesced"] += 1
+    pending_status[key] = text
+    task = status_tasks.get(key)
+    if task is None or task.done():
+        status_tasks[key] = asyncio.create_task(_flush_status(key))
+
+async def _flush_status(key: Tuple[int, int]):
+    chat_id, message_id = key
+    try:
+        while key in pending_status:
+            await _acquire(chat_id, priority=False)
+            text = pending_status.pop(key, None)
+            if text is None:
+                break
+            status_in_flight.add(key)
+            try:
+                await _get_bot().edit_message_text(chat_id=chat_id, message_id=message_id, text=text)
+            except RetryAfter as e:
+                stats["retry_after"] += 1
+                _chat_bucket(chat_id).cool_down(_retry_seconds(e))
+                pending_status.setdefault(key, text)
+            except BadRequest:
+                pass
+            except Exception as e:
+                logger.debug(f"Status edit failed for chat {chat_id}: {e}")
+            finally:
+                status_in_flight.discard(key)
+    finally:
+        if status_tasks.get(key) is asyncio.current_task():
+            status_tasks.pop(key, None)
+
+async def discard_status(chat_id: int, message_id: int):
+    key = (chat_id, message_id)
+    pending_status.pop(key, None)
+    task = status_tasks.get(key)
+    if task is None or task.done() or task is asyncio.current_task():
+        return
+    if key not in status_in_flight:
+        task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+async def queue_reminder(chat_id: int, message: str):
+    if reminder_queue is None:
+        await send_message(chat_id, f"🔔 Reminder: {message}")
+        return
+    delivered = asyncio.get_running_loop().create_future()
+    reminder_queue.put_nowait((chat_id, message, delivered))
+    await delivered
+
+def _settle(delivered: asyncio.Future, error: Optional[BaseException] = None):
+    if delivered.done():
+        return
+    if error is None:
+        delivered.set_result(True)
+    else:
+        delivered.set_exception(error)
+
+async def _deliver_reminders():
+    batch_wait = _settings().get("reminder_batch_wait", DEFAULT_REMINDER_BATCH_WAIT)
+    while True:
+        batch = [await reminder_queue.get()]
+        try:
+            await asyncio.sleep(batch_wait)
+            while not reminder_queue.empty():
+                batch.append(reminder_queue.get_nowait())
+            grouped: Dict[int, List[Tuple[str, asyncio.Future]]] = defaultdict(list)
+            for chat_id, message, delivered in batch:
+                grouped[chat_id].append((message, delivered))
+            for chat_id, entries in grouped.items():
+                text = "\n".join(f"🔔 Reminder: {message}" for message, _ in entries)
+                try:
+                    await _call(chat_id, "send_message", priority=False, text=text)
+                    stats["sent"] += 1
+                    error = None
+                except Exception as e:
+                    logger.error(f"Error sending reminders to chat {chat_id}: {e}")
+                    error = e
+                for _, delivered in entries:
+                    _settle(delivered, error)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Reminder delivery error: {e}")
+        finally:
+            for _, _, delivered in batch:
+                _settle(delivered, RuntimeError("Reminder was not delivered"))
+                reminder_queue.task_done()
+
+def start(application_bot):
+    global bot, reminder_queue, reminder_worker
+    bot = application_bot
+    if reminder_worker is None or reminder_worker.done():
+        reminder_queue = asyncio.Queue()
+        reminder_worker = asyncio.create_task(_deliver_reminders())
+
+async def stop():
+    global reminder_queue, reminder_worker
+    if reminder_queue is not None:
+        try:
+            await asyncio.wait_for(reminder_queue.join(), timeout=_settings().get("drain_timeout", 10.0))
+        except asyncio.TimeoutError:
+            logger.warning(f"Outbox drain timed out with {reminder_queue.qsize()} reminders queued")
+    if reminder_worker is not None:
+        reminder_worker.cancel()
+        await asyncio.gather(reminder_worker, return_exceptions=True)
+    while reminder_queue is not None and not reminder_queue.empty():
+        _, _, delivered = reminder_queue.get_nowait()
+        _settle(delivered, RuntimeError("Outbox stopped before delivery"))
+    pending_status.clear()
+    tasks = list(status_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    status_tasks.clear()
+    reminder_queue = None
+    reminder_worker = None
+
+def get_stats() -> Dict[str, Any]:
+    return {
+        "pending_status": len(pending_status),
+        "queued_reminders": reminder_queue.qsize() if reminder_queue is not None else 0,
+        **stats,
+    }
@@ -1,8 +1,13 @@
 import asyncio
+import json
 import logging
+import time
 import httpx
-from typing import List, Dict, Any, Optional, Callable, Union
+from collections import deque
+from typing import List, Dict, Any, Optional, Callable, Union, Tuple, AsyncIterator, Awaitable
 from src import config
+from src.ratelimit import rate_limiter, RateLimitExceeded, DEFAULT_MAX_WAIT
+from src.cache import response_cache, make_cache_key
 
 logger = logging.getLogger(__name__)
 
@@ -22,33 +27,237 @@ PROVIDER_ENDPOINTS = {
     }
 }
 
+GOOGLE_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+BLOCKED_RESPONSE = "Response blocked by safety filter"
+EMPTY_RESPONSE = "No response text"
+UNCACHEABLE_RESPONSES = {BLOCKED_RESPONSE, EMPTY_RESPONSE}
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 class ProviderError(Exception):
     pass
 
+class RateLimitError(ProviderError):
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def _split_provider_model(provider_model: str) -> Tuple[str, str]:
+    if "/" in provider_model:
+        provider_name, model = provider_model.split("/", 1)
+        return provider_name, model
+    return config.DEFAULT_PROVIDER, provider_model
+
+def _normalize_fallback(fallback: Union[str, List[str], Dict[str, Any], None]) -> List[str]:
+    if fallback is None:
+        return []
+    if isinstance(fallback, dict):
+        fallback = fallback.get("models", [])
+    if isinstance(fallback, str):
+        return [fallback]
+    return list(fallback)
+
+async def _iter_sse_data(response: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        payload = line[5:].strip()
+        if not payload:
+            continue
+        if payload == "[DONE]":
+            break
+        try:
+            yield json.loads(payload)
+        except json.JSONDecodeError:
+            continue
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, settings: Dict[str, Any]):
+        self.name = name
+        self.window = settings.get("window", 20)
+        self.min_requests = settings.get("min_requests", 5)
+        self.error_threshold = settings.get("error_threshold", 0.5)
+        self.slow_threshold = settings.get("slow_call_seconds", 30.0)
+        self.slow_rate_threshold = settings.get("slow_call_rate", 0.8)
+        self.open_seconds = settings.get("open_seconds", 60.0)
+        self.outcomes: deque = deque(maxlen=self.window)
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.last_error = ""
+
+    def _refresh(self):
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+
+    def current_state(self) -> str:
+        self._refresh()
+        return self.state
+
+    def allow(self) -> bool:
+        self._refresh()
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def holds_probe(self) -> bool:
+        return self.state == self.HALF_OPEN and self.probe_in_flight
+
+    def release_probe(self):
+        self.probe_in_flight = False
+
+    def force_probe(self):
+        self.state = self.HALF_OPEN
+        self.probe_in_flight = False
+        logger.info(f"All circuits open, probing {self.name} early")
+
+    def _trip(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        logger.warning(f"Circuit opened for {self.name}: {self.last_error}")
+
+    def record_success(self, elapsed: float):
+        self.outcomes.append((True, elapsed))
+        if self.state == self.HALF_OPEN:
+            logger.info(f"Circuit closed for {self.name} after successful probe")
+            self.state = self.CLOSED
+            self.probe_in_flight = False
+            self.outcomes.clear()
+            self.outcomes.append((True, elapsed))
+            return
+        self._evaluate()
+
+    def record_failure(self, elapsed: float, error: str = ""):
+        self.outcomes.append((False, elapsed))
+        self.last_error = error[:100]
+        if self.state == self.HALF_OPEN:
+            self._trip()
+            return
+        self._evaluate()
+
+    def _evaluate(self):
+        if self.state != self.CLOSED or len(self.outcomes) < self.min_requests:
+            return
+        if self.error_rate() >= self.error_threshold or self.slow_rate() >= self.slow_rate_threshold:
+            self._trip()
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self.outcomes if not ok) / len(self.outcomes)
+
+    def slow_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for _, elapsed in self.outcomes if elapsed >= self.slow_threshold) / len(self.outcomes)
+
+    def health_score(self) -> float:
+        if self.current_state() == self.OPEN:
+            return 0.0
+        return max(0.0, 1.0 - self.error_rate() - 0.5 * self.slow_rate())
+
 class ProviderManager:
     def __init__(self):
         self.providers = config.PROVIDERS
-        self.key_indices: Dict[str, int] = {}
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+        self.latencies: Dict[str, deque] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def _get_base_url(self, provider_name: str) -> str:
+        if provider_name == "google":
+            return GOOGLE_BASE_URL
+        provider = self.providers.get(provider_name, {})
+        return provider.get("base_url", "").rstrip("/")
+
+    def _build_client(self, provider_name: str) -> httpx.AsyncClient:
+        http_settings = config.HTTP_SETTINGS
+        provider_config = self.providers.get(provider_name, {})
+        timeout = http_settings.get("timeout", 60.0)
+        limits = httpx.Limits(
+            max_connections=http_settings.get("max_connections", 20),
+            max_keepalive_connections=http_settings.get("max_keepalive_connections", 10),
+            keepalive_expiry=http_settings.get("keepalive_expiry", 30.0),
+        )
+        use_http2 = provider_config.get("http2", http_settings.get("http2", True)) and HTTP2_AVAILABLE
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=http_settings.get("connect_timeout", 10.0)),
+            limits=limits,
+            http2=use_http2,
+        )
 
-    def _get_provider_key_index(self, provider_name: str) -> int:
-        if provider_name not in self.key_indices:
-            self.key_indices[provider_name] = 0
-        return self.key_indices[provider_name]
+    def get_client(self, provider_name: str) -> httpx.AsyncClient:
+        base_url = self._get_base_url(provider_name)
+        client = self.clients.get(base_url)
+        if client is None or client.is_closed:
+            client = self._build_client(provider_name)
+            self.clients[base_url] = client
+        return client
 
-    def _rotate_key_index(self, provider_name: str, key_count: int):
-        if key_count > 1:
-            self.key_indices[provider_name] = (self._get_provider_key_index(provider_name) + 1) % key_count
+    async def open_clients(self):
+        for provider_name in list(self.providers.keys()):
+            if self._get_base_url(provider_name):
+                self.get_client(provider_name)
+        logger.info(f"HTTP clients ready: {len(self.clients)} (http2={HTTP2_AVAILABLE})")
 
-    def _get_api_key(self, provider_name: str, provider_config: Dict[str, Any]) -> str:
+    async def close_clients(self):
+        clients = list(self.clients.values())
+        self.clients = {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception:
+                pass
+
+    def _get_api_keys(self, provider_config: Dict[str, Any]) -> List[str]:
         api_key = provider_config.get("api_key", "")
-        if isinstance(api_key, list) and len(api_key) > 1:
-            idx = self._get_provider_key_index(provider_name)
-            if idx < len(api_key):
-                key = api_key[idx]
-                self._rotate_key_index(provider_name, len(api_key))
-                return key
-            return api_key[0] if api_key else ""
-        return api_key if isinstance(api_key, str) else ""
+        if isinstance(api_key, list):
+            return [k for k in api_key if isinstance(k, str) and k]
+        return [api_key] if isinstance(api_key, str) and api_key else []
+
+    async def _acquire_api_key(self, provider_name: str, keys: List[str]) -> str:
+        try:
+            return await rate_limiter.acquire(provider_name, keys)
+        except RateLimitExceeded as e:
+            raise RateLimitError(str(e), e.retry_after)
+
+    async def _post(self, provider_name: str, keys: List[str], endpoint: str, build_headers: Callable[[str], Dict[str, str]], status_callback: Optional[Callable] = None, **kwargs) -> httpx.Response:
+        settings = config.RATE_LIMIT_SETTINGS
+        max_retries = settings.get("max_retries", 1)
+        max_wait = settings.get("max_wait", DEFAULT_MAX_WAIT)
+        client = self.get_client(provider_name)
+        attempt = 0
+        while True:
+            api_key = await self._acquire_api_key(provider_name, keys)
+            response = await client.post(endpoint, headers=build_headers(api_key), **kwargs)
+            rate_limiter.update_from_headers(provider_name, api_key, response.headers)
+            if response.status_code != 429:
+                response.raise_for_status()
+                return response
+
+            rate_limiter.penalize(provider_name, api_key, response.headers)
+            wait = rate_limiter.soonest_available(provider_name, keys)
+            if attempt >= max_retries or wait > max_wait:
+                raise RateLimitError(f"Provider {provider_name} rate limited (429), retry in {wait:.0f}s", wait)
+            attempt += 1
+            if wait >= 1 and status_callback:
+                try:
+                    await status_callback(f"⏳ Retrying in {wait:.0f}s...")
+                except Exception:
+                    pass
 
     def _get_endpoint(self, provider_name: str, capability: str = "chat") -> str:
         provider_endpoints = PROVIDER_ENDPOINTS.get(provider_name, {})
@@ -107,17 +316,7 @@ class ProviderManager:
             "max_tokens": agent_config.get("max_tokens", 1024)
         }
 
-    async def _call_google_native(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 1024) -> str:
-        provider = self.providers.get("google")
-        if not provider:
-            raise ProviderError("Google provider not found in config")
-        
-        api_key = self._get_api_key("google", provider)
-        if not api_key:
-            raise ProviderError("No API key for Google")
-        
-        endpoint = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-        
+    def _build_google_body(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
         system_instruction = None
         contents = []
         
@@ -146,57 +345,177 @@ class ProviderManager:
             "temperature": temperature,
             "maxOutputTokens": max_tokens
         }
+        return request_body
+
+    async def _call_google_native(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 1024, json_schema: Optional[Dict[str, Any]] = None) -> str:
+        provider = self.providers.get("google")
+        if not provider:
+            raise ProviderError("Google provider not found in config")
+        
+        keys = self._get_api_keys(provider)
+        if not keys:
+            raise ProviderError("No API key for Google")
+        
+        endpoint = f"{GOOGLE_BASE_URL}/models/{model}:generateContent"
+        request_body = self._build_google_body(messages, temperature, max_tokens)
+        if json_schema:
+            request_body["generationConfig"]["responseMimeType"] = "application/json"
+            request_body["generationConfig"]["responseSchema"] = json_schema
         
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    endpoint,
-                    headers={
-                        "x-goog-api-key": api_key,
-                        "Content-Type": "application/json",
-                    },
-                    json=request_body,
-                )
-                response.raise_for_status()
-                data = response.json()
+            response = await self._post(
+                "google",
+                keys,
+                endpoint,
+                lambda api_key: {
+                    "x-goog-api-key": api_key,
+                    "Content-Type": "application/json",
+                },
+                json=request_body,
+            )
+            data = response.json()
+            
+            try:
+                candidates = data.get("candidates", [])
+                if not candidates:
+                    return BLOCKED_RESPONSE
                 
-                try:
-                    candidates = data.get("candidates", [])
-                    if not candidates:
-                        return "Response blocked by safety filter"
-                    
-                    first_candidate = candidates[0]
-                    content = first_candidate.get("content", {})
-                    parts = content.get("parts", [])
-                    
-                    if not parts:
-                        return "Response blocked by safety filter"
-                    
-                    return parts[0].get("text", "No response text")
-                    
-                except (KeyError, IndexError) as e:
-                    return f"Response blocked by safety filter"
+                first_candidate = candidates[0]
+                content = first_candidate.get("content", {})
+                parts = content.get("parts", [])
+                
+                if not parts:
+                    return BLOCKED_RESPONSE
+                
+                return parts[0].get("text", EMPTY_RESPONSE)
+                
+            except (KeyError, IndexError) as e:
+                return BLOCKED_RESPONSE
                     
         except httpx.HTTPStatusError as e:
             raise ProviderError(f"Google API error: {e.response.status_code}")
+        except ProviderError:
+            raise
         except Exception as e:
             raise ProviderError(f"Google API call failed: {str(e)}")
 
-    async def call_provider(self, provider_name: str, model: str, messages: List[Dict[str, str]], capability: str = "chat", status_callback: Optional[Callable] = None) -> str:
+    def _record_latency(self, provider_name: str, model: str, elapsed: float):
+        window = config.HEDGING_SETTINGS.get("window", 50)
+        key = f"{provider_name}/{model}"
+        samples = self.latencies.get(key)
+        if samples is None or samples.maxlen != window:
+            samples = deque(samples or [], maxlen=window)
+            self.latencies[key] = samples
+        samples.append(elapsed)
+
+    def get_latency_percentile(self, provider_name: str, model: str, percentile: float = 95) -> Optional[float]:
+        samples = self.latencies.get(f"{provider_name}/{model}")
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        idx = min(len(ordered) - 1, max(0, int(round(percentile / 100 * len(ordered))) - 1))
+        return ordered[idx]
+
+    def _get_hedge_options(self, fallback: Union[str, List[str], Dict[str, Any], None], hedge: Union[bool, Dict[str, Any], None]) -> Optional[Dict[str, Any]]:
+        if hedge is None and isinstance(fallback, dict):
+            hedge = fallback.get("hedge")
+        if not hedge:
+            return None
+        options = dict(config.HEDGING_SETTINGS)
+        if isinstance(hedge, dict):
+            if not hedge.get("enabled", True):
+                return None
+            options.update(hedge)
+        return options
+
+    def _hedge_delay(self, provider_name: str, model: str, options: Dict[str, Any]) -> float:
+        samples = self.latencies.get(f"{provider_name}/{model}")
+        if not samples or len(samples) < options.get("min_samples", 5):
+            delay = options.get("default_delay", 8.0)
+        else:
+            delay = self.get_latency_percentile(provider_name, model, options.get("percentile", 95)) or options.get("default_delay", 8.0)
+        return min(max(delay, options.get("min_delay", 1.5)), options.get("max_delay", 20.0))
+
+    def get_breaker(self, provider_name: str, model: str) -> CircuitBreaker:
+        key = f"{provider_name}/{model}"
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(key, config.CIRCUIT_BREAKER_SETTINGS)
+            self.breakers[key] = breaker
+        return breaker
+
+    def _order_chain(self, chain: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        if not config.CIRCUIT_BREAKER_SETTINGS.get("enabled", True):
+            return chain
+        usable = [entry for entry in chain if self.get_breaker(*entry).current_state() != CircuitBreaker.OPEN]
+        if not usable:
+            probe = min(chain, key=lambda entry: self.get_breaker(*entry).opened_at)
+            self.get_breaker(*probe).force_probe()
+            return [probe]
+        return sorted(usable, key=lambda entry: -self.get_breaker(*entry).health_score())
+
+    def get_health_report(self) -> List[Dict[str, Any]]:
+        report = []
+        for key, breaker in sorted(self.breakers.items()):
+            provider_name, model = key.split("/", 1)
+            report.append({
+                "endpoint": key,
+                "state": breaker.current_state(),
+                "health": round(breaker.health_score(), 2),
+                "error_rate": round(breaker.error_rate(), 2),
+                "p95": self.get_latency_percentile(provider_name, model),
+                "last_error": breaker.last_error,
+            })
+        return report
+
+    async def _guarded(self, provider_name: str, model: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        breaker = self.get_breaker(provider_name, model)
+        enabled = config.CIRCUIT_BREAKER_SETTINGS.get("enabled", True)
+        if enabled and not breaker.allow():
+            raise ProviderError(f"Circuit open for {provider_name}/{model}")
+        probing = enabled and breaker.holds_probe()
+        started = time.monotonic()
+        recorded = False
+        try:
+            result = await call()
+            elapsed = time.monotonic() - started
+            breaker.record_success(elapsed)
+            recorded = True
+            return result
+        except RateLimitError:
+            raise
+        except ProviderError as e:
+            breaker.record_failure(time.monotonic() - started, str(e))
+            recorded = True
+            raise
+        finally:
+            if probing and not recorded:
+                breaker.release_probe()
+
+    async def call_provider(self, provider_name: str, model: str, messages: List[Dict[str, str]], capability: str = "chat", status_callback: Optional[Callable] = None, json_schema: Optional[Dict[str, Any]] = None) -> str:
+        started = time.monotonic()
+        result = await self._guarded(
+            provider_name, model,
+            lambda: self._call_provider_raw(provider_name, model, messages, capability, status_callback, json_schema),
+        )
+        self._record_latency(provider_name, model, time.monotonic() - started)
+        return result
+
+    async def _call_provider_raw(self, provider_name: str, model: str, messages: List[Dict[str, str]], capability: str = "chat", status_callback: Optional[Callable] = None, json_schema: Optional[Dict[str, Any]] = None) -> str:
         if provider_name == "google":
             brain_config = config.BOT_CONFIG.get("brain", {})
             temperature = brain_config.get("temperature", 0.3)
             max_tokens = brain_config.get("max_tokens", 1024)
-            return await self._call_google_native(model, messages, temperature, max_tokens)
+            return await self._call_google_native(model, messages, temperature, max_tokens, json_schema)
         
         provider = self.providers.get(provider_name)
         if not provider:
             raise ProviderError(f"Provider '{provider_name}' not found in config")
 
-        api_key = self._get_api_key(provider_name, provider)
+        keys = self._get_api_keys(provider)
         base_url = provider.get("base_url", "")
         
-        if not api_key:
+        if not keys:
             raise ProviderError(f"No API key for provider '{provider_name}'")
 
         self._check_free_enforcement(provider_name, model)
@@ -204,45 +523,34 @@ class ProviderManager:
         endpoint_path = self._get_endpoint(provider_name, capability)
         endpoint = f"{base_url.rstrip('/')}/{endpoint_path.lstrip('/')}"
 
-        async def do_request():
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    endpoint,
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                        "Content-Type": "application/json",
-                    },
-                    json={
-                        "model": model,
-                        "messages": messages,
-                    },
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                try:
-                    return data["choices"][0]["message"]["content"]
-                except (KeyError, IndexError):
-                    raise ProviderError("No response content from provider")
+        request_body: Dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+        }
+        if json_schema:
+            request_body["response_format"] = {"type": "json_object"}
 
         try:
-            return await do_request()
+            response = await self._post(
+                provider_name,
+                keys,
+                endpoint,
+                lambda api_key: {
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json",
+                },
+                status_callback,
+                json=request_body,
+            )
+            data = response.json()
+            
+            try:
+                return data["choices"][0]["message"]["content"]
+            except (KeyError, IndexError):
+                raise ProviderError("No response content from provider")
         except httpx.HTTPStatusError as e:
             status_code = e.response.status_code
-            if status_code == 429:
-                if status_callback:
-                    try:
-                        await status_callback("⏳ Retrying in 3s...")
-                    except Exception:
-                        pass
-                await asyncio.sleep(3)
-                try:
-                    return await do_request()
-                except httpx.HTTPStatusError as retry_error:
-                    if retry_error.response.status_code == 429:
-                        raise ProviderError(f"Provider API error after retry: {retry_error.response.status_code}")
-                    raise
-            elif status_code == 402:
+            if status_code == 402:
                 raise ProviderError(f"Provider {provider_name} requires payment (402)")
             elif status_code == 400:
                 logger.warning(f"Provider {provider_name} returned 400: {e.response.text[:200]}")
@@ -254,68 +562,293 @@ class ProviderManager:
         except Exception as e:
             raise ProviderError(f"Provider call failed: {str(e)}")
 
+    def _check_stream_response(self, provider_name: str, api_key: str, response: httpx.Response):
+        rate_limiter.update_from_headers(provider_name, api_key, response.headers)
+        if response.status_code == 429:
+            wait = rate_limiter.penalize(provider_name, api_key, response.headers)
+            raise RateLimitError(f"Provider {provider_name} rate limited (429), retry in {wait:.0f}s", wait)
+        response.raise_for_status()
+
+    async def _stream_google_native(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 1024) -> AsyncIterator[str]:
+        provider = self.providers.get("google")
+        if not provider:
+            raise ProviderError("Google provider not found in config")
+        
+        keys = self._get_api_keys(provider)
+        if not keys:
+            raise ProviderError("No API key for Google")
+        
+        endpoint = f"{GOOGLE_BASE_URL}/models/{model}:streamGenerateContent?alt=sse"
+        request_body = self._build_google_body(messages, temperature, max_tokens)
+        
+        try:
+            api_key = await self._acquire_api_key("google", keys)
+            client = self.get_client("google")
+            async with client.stream(
+                "POST",
+                endpoint,
+                headers={
+                    "x-goog-api-key": api_key,
+                    "Content-Type": "application/json",
+                },
+                json=request_body,
+            ) as response:
+                self._check_stream_response("google", api_key, response)
+                async for data in _iter_sse_data(response):
+                    for candidate in data.get("candidates", [])[:1]:
+                        for part in candidate.get("content", {}).get("parts", []):
+                            text = part.get("text")
+                            if text:
+                                yield text
+        except httpx.HTTPStatusError as e:
+            raise ProviderError(f"Google API error: {e.response.status_code}")
+        except ProviderError:
+            raise
+        except Exception as e:
+            raise ProviderError(f"Google API stream failed: {str(e)}")
+
+    async def stream_provider(self, provider_name: str, model: str, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        if provider_name == "google":
+            brain_config = config.BOT_CONFIG.get("brain", {})
+            temperature = brain_config.get("temperature", 0.3)
+            max_tokens = brain_config.get("max_tokens", 1024)
+            async for chunk in self._stream_google_native(model, messages, temperature, max_tokens):
+                yield chunk
+            return
+        
+        provider = self.providers.get(provider_name)
+        if not provider:
+            raise ProviderError(f"Provider '{provider_name}' not found in config")
+
+        keys = self._get_api_keys(provider)
+        base_url = provider.get("base_url", "")
+        
+        if not keys:
+            raise ProviderError(f"No API key for provider '{provider_name}'")
+
+        self._check_free_enforcement(provider_name, model)
+        
+        endpoint_path = self._get_endpoint(provider_name, "chat")
+        endpoint = f"{base_url.rstrip('/')}/{endpoint_path.lstrip('/')}"
+
+        try:
+            api_key = await self._acquire_api_key(provider_name, keys)
+            client = self.get_client(provider_name)
+            async with client.stream(
+                "POST",
+                endpoint,
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json",
+                    "Accept": "text/event-stream",
+                },
+                json={
+                    "model": model,
+                    "messages": messages,
+                    "stream": True,
+                },
+            ) as response:
+                self._check_stream_response(provider_name, api_key, response)
+                async for data in _iter_sse_data(response):
+                    try:
+                        text = data["choices"][0].get("delta", {}).get("content")
+                    except (KeyError, IndexError):
+                        continue
+                    if text:
+                        yield text
+        except httpx.HTTPStatusError as e:
+            raise ProviderError(f"Provider API error: {e.response.status_code}")
+        except ProviderError:
+            raise
+        except Exception as e:
+            raise ProviderError(f"Provider stream failed: {str(e)}")
+
+    async def stream_with_fallback(self, provider_model: str, messages: List[Dict[str, str]], fallback: Union[str, List[str], Dict[str, Any], None] = None) -> AsyncIterator[str]:
+        chain = self._order_chain([_split_provider_model(entry) for entry in [provider_model] + _normalize_fallback(fallback)])
+        last_error: Optional[Exception] = None
+        
+        for provider_name, model in chain:
+            breaker = self.get_breaker(provider_name, model)
+            enabled = config.CIRCUIT_BREAKER_SETTINGS.get("enabled", True)
+            if enabled and not breaker.allow():
+                last_error = ProviderError(f"Circuit open for {provider_name}/{model}")
+                continue
+            probing = enabled and breaker.holds_probe()
+            started = False
+            begin = time.monotonic()
+            try:
+                async for chunk in self.stream_provider(provider_name, model, messages):
+                    started = True
+                    yield chunk
+                elapsed = time.monotonic() - begin
+                breaker.record_success(elapsed)
+                self._record_latency(provider_name, model, elapsed)
+                return
+            except ProviderError as e:
+                if not isinstance(e, RateLimitError):
+                    breaker.record_failure(time.monotonic() - begin, str(e))
+                if started:
+                    raise
+                last_error = e
+                continue
+            finally:
+                if probing and breaker.holds_probe():
+                    breaker.release_probe()
+        raise ProviderError(f"All providers failed. Last error: {last_error}")
+
     async def transcribe_audio(self, audio_bytes: bytes, provider_name: str = "groq") -> str:
         provider = self.providers.get(provider_name)
         if not provider:
             raise ProviderError(f"Provider '{provider_name}' not found")
 
-        api_key = self._get_api_key(provider_name, provider)
+        keys = self._get_api_keys(provider)
+        if not keys:
+            raise ProviderError(f"No API key for provider '{provider_name}'")
         base_url = provider.get("base_url", "").rstrip("/")
         endpoint = f"{base_url}/audio/transcriptions"
 
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    endpoint,
-                    headers={"Authorization": f"Bearer {api_key}"},
-                    files={"file": ("audio.ogg", audio_bytes, "audio/ogg")},
-                    data={"model": "whisper-large-v3-turbo", "response_format": "text"}
-                )
-                response.raise_for_status()
-                return response.text.strip()
+            response = await self._post(
+                provider_name,
+                keys,
+                endpoint,
+                lambda api_key: {"Authorization": f"Bearer {api_key}"},
+                files={"file": ("audio.ogg", audio_bytes, "audio/ogg")},
+                data={"model": "whisper-large-v3-turbo", "response_format": "text"}
+            )
+            return response.text.strip()
         except httpx.HTTPStatusError as e:
             raise ProviderError(f"Transcription error: {e.response.status_code}: {e.response.text[:100]}")
+        except ProviderError:
+            raise
         except Exception as e:
             raise ProviderError(f"Transcription failed: {str(e)}")
 
-    async def call_with_fallback(self, provider_model: str, messages: List[Dict[str, str]], fallback: Union[str, List[str], None] = None, capability: str = "chat", status_callback: Optional[Callable] = None) -> str:
-        if "/" in provider_model:
-            primary_provider, primary_model = provider_model.split("/", 1)
-        else:
-            primary_provider = config.DEFAULT_PROVIDER
-            primary_model = provider_model
+    async def embed_texts(self, provider_model: str, texts: List[str]) -> List[List[float]]:
+        provider_name, model = _split_provider_model(provider_model)
+        provider = self.providers.get(provider_name)
+        if not provider:
+            raise ProviderError(f"Provider '{provider_name}' not found")
+        endpoint = PROVIDER_ENDPOINTS.get(provider_name, {}).get("embeddings")
+        if not endpoint:
+            raise ProviderError(f"Provider '{provider_name}' has no embeddings endpoint")
 
-        if fallback is None:
-            fallbacks = []
-        elif isinstance(fallback, str):
-            fallbacks = [fallback]
-        else:
-            fallbacks = fallback
+        keys = self._get_api_keys(provider)
+        if not keys:
+            raise ProviderError(f"No API key for provider '{provider_name}'")
+        url = f"{self._get_base_url(provider_name)}/{endpoint}"
+        try:
+            response = await self._post(
+                provider_name,
+                keys,
+                url,
+                lambda api_key: {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+                json={"model": model, "input": texts}
+            )
+            data = sorted(response.json().get("data", []), key=lambda item: item.get("index", 0))
+        except httpx.HTTPStatusError as e:
+            raise ProviderError(f"Embeddings error: {e.response.status_code}: {e.response.text[:100]}")
+        except ProviderError:
+            raise
+        except Exception as e:
+            raise ProviderError(f"Embeddings failed: {str(e)}")
+        if len(data) != len(texts):
+            raise ProviderError(f"Embeddings returned {len(data)} vectors for {len(texts)} inputs")
+        return [item["embedding"] for item in data]
+
+    async def call_with_fallback(self, provider_model: str, messages: List[Dict[str, str]], fallback: Union[str, List[str], Dict[str, Any], None] = None, capability: str = "chat", status_callback: Optional[Callable] = None, hedge: Union[bool, Dict[str, Any], None] = None, cache: bool = False, cache_ttl: Optional[float] = None, json_schema: Optional[Dict[str, Any]] = None) -> str:
+        if not cache or not response_cache.enabled():
+            return await self._call_with_fallback_uncached(provider_model, messages, fallback, capability, status_callback, hedge, json_schema)
+        
+        cache_key = make_cache_key(provider_model, messages, {"capability": capability, "json_schema": json_schema})
+        cached = await response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        result = await self._call_with_fallback_uncached(provider_model, messages, fallback, capability, status_callback, hedge, json_schema)
+        if result not in UNCACHEABLE_RESPONSES:
+            await response_cache.set(cache_key, result, cache_ttl)
+        return result
+
+    async def _call_with_fallback_uncached(self, provider_model: str, messages: List[Dict[str, str]], fallback: Union[str, List[str], Dict[str, Any], None], capability: str, status_callback: Optional[Callable], hedge: Union[bool, Dict[str, Any], None], json_schema: Optional[Dict[str, Any]] = None) -> str:
+        chain = self._order_chain([_split_provider_model(entry) for entry in [provider_model] + _normalize_fallback(fallback)])
+        hedge_options = self._get_hedge_options(fallback, hedge)
+        if hedge_options and len(chain) > 1:
+            return await self._call_hedged(chain, messages, capability, status_callback, hedge_options, json_schema)
+
+        last_error: Optional[ProviderError] = None
+        for provider_name, model in chain:
+            try:
+                return await self.call_provider(provider_name, model, messages, capability, status_callback, json_schema)
+            except ProviderError as e:
+                last_error = e
+                continue
+        raise ProviderError(f"All providers failed. Last error: {last_error}")
+
+    async def _call_hedged(self, chain: List[Tuple[str, str]], messages: List[Dict[str, str]], capability: str, status_callback: Optional[Callable], options: Dict[str, Any], json_schema: Optional[Dict[str, Any]] = None) -> str:
+        pending: set = set()
+        launched: Dict[asyncio.Task, Tuple[str, str, float]] = {}
+        last_error: Optional[BaseException] = None
+        next_idx = 0
+
+        def launch() -> Tuple[str, str]:
+            nonlocal next_idx
+            provider_name, model = chain[next_idx]
+            next_idx += 1
+            task = asyncio.create_task(self.call_provider(provider_name, model, messages, capability, status_callback, json_schema))
+            launched[task] = (provider_name, model, time.monotonic())
+            pending.add(task)
+            return provider_name, model
 
         try:
-            return await self.call_provider(primary_provider, primary_model, messages, capability, status_callback)
-        except ProviderError as primary_error:
-            last_error = primary_error
-            for fb in fallbacks:
-                if "/" in fb:
-                    fb_provider, fb_model = fb.split("/", 1)
-                else:
-                    fb_provider = config.DEFAULT_PROVIDER
-                    fb_model = fb
-                try:
-                    return await self.call_provider(fb_provider, fb_model, messages, capability, status_callback)
-                except ProviderError as e:
-                    last_error = e
-                    continue
-            raise ProviderError(f"All providers failed. Last error: {last_error}")
+            running = launch()
+            while pending:
+                timeout = self._hedge_delay(*running, options) if next_idx < len(chain) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    last_error = error
+
+                if next_idx < len(chain):
+                    if not done:
+                        logger.info(f"Hedging: {running[0]}/{running[1]} slow after {timeout:.1f}s, starting {chain[next_idx][0]}/{chain[next_idx][1]}")
+                    running = launch()
+        finally:
+            for task in pending:
+                task.cancel()
+                provider_name, model, started = launched[task]
+                self._record_latency(provider_name, model, time.monotonic() - started)
+
+        raise ProviderError(f"All providers failed. Last error: {last_error}")
 
 provider_manager = ProviderManager()
 
 async def call_provider(provider_name: str, model: str, messages: List[Dict[str, str]], capability: str = "chat", status_callback: Optional[Callable] = None) -> str:
     return await provider_manager.call_provider(provider_name, model, messages, capability, status_callback)
 
-async def call_with_fallback(provider_model: str, messages: List[Dict[str, str]], fallback: Union[str, List[str], None] = None, capability: str = "chat", status_callback: Optional[Callable] = None) -> str:
-    return await provider_manager.call_with_fallback(provider_model, messages, fallback, capability, status_callback)
+async def call_with_fallback(provider_model: str, messages: List[Dict[str, str]], fallback: Union[str, List[str], Dict[str, Any], None] = None, capability: str = "chat", status_callback: Optional[Callable] = None, hedge: Union[bool, Dict[str, Any], None] = None, cache: bool = False, cache_ttl: Optional[float] = None, json_schema: Optional[Dict[str, Any]] = None) -> str:
+    return await provider_manager.call_with_fallback(provider_model, messages, fallback, capability, status_callback, hedge, cache, cache_ttl, json_schema)
+
+def get_health_report() -> List[Dict[str, Any]]:
+    return provider_manager.get_health_report()
+
+def stream_with_fallback(provider_model: str, messages: List[Dict[str, str]], fallback: Union[str, List[str], Dict[str, Any], None] = None) -> AsyncIterator[str]:
+    return provider_manager.stream_with_fallback(provider_model, messages, fallback)
 
 async def transcribe_audio(audio_bytes: bytes, provider_name: str = "groq") -> str:
     return await provider_manager.transcribe_audio(audio_bytes, provider_name)
+
+async def embed_texts(provider_model: str, texts: List[str]) -> List[List[float]]:
+    return await provider_manager.embed_texts(provider_model, texts)
+
+def get_client(provider_name: str = "web") -> httpx.AsyncClient:
+    return provider_manager.get_client(provider_name)
+
+async def init_clients():
+    await provider_manager.open_clients()
+
+async def close_clients():
+    await provider_manager.close_clients()
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, List, Tuple, Mapping
+from src import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUESTS_PER_MINUTE = 30
+DEFAULT_BURST = 5
+DEFAULT_COOLDOWN = 10.0
+DEFAULT_MAX_WAIT = 5.0
+
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+class RateLimitExceeded(Exception):
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBucket:
+    def __init__(self, requests_per_minute: float, burst: int):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.cooldown_until = 0.0
+        self.remote_remaining: Optional[int] = None
+        self.remote_reset_at = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.remote_remaining is not None and now >= self.remote_reset_at:
+            self.remote_remaining = None
+
+    def headroom(self) -> float:
+        self._refill()
+        if time.monotonic() < self.cooldown_until:
+            return 0.0
+        if self.remote_remaining is not None:
+            return min(self.tokens, float(self.remote_remaining))
+        return self.tokens
+
+    def wait_time(self) -> float:
+        self._refill()
+        now = time.monotonic()
+        waits = [0.0]
+        if now < self.cooldown_until:
+            waits.append(self.cooldown_until - now)
+        if self.remote_remaining == 0:
+            waits.append(self.remote_reset_at - now)
+        if self.tokens < 1.0 and self.rate > 0:
+            waits.append((1.0 - self.tokens) / self.rate)
+        return max(waits)
+
+    def take(self) -> bool:
+        if self.headroom() < 1.0:
+            return False
+        self.tokens -= 1.0
+        if self.remote_remaining is not None:
+            self.remote_remaining = max(0, self.remote_remaining - 1)
+        return True
+
+    def cool_down(self, seconds: float):
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + seconds)
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        number = None
+    if number is not None:
+        if number > 1e12:
+            return max(0.0, number / 1000.0 - time.time())
+        if number > 1e9:
+            return max(0.0, number - time.time())
+        return max(0.0, number)
+    matches = DURATION_PATTERN.findall(value)
+    if matches:
+        units = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+        return sum(float(amount) * units[unit] for amount, unit in matches)
+    try:
+        reset_at = parsedate_to_datetime(value)
+        if reset_at.tzinfo is None:
+            reset_at = reset_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def get_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    retry_after = parse_duration(headers.get("retry-after"))
+    if retry_after is not None:
+        return retry_after
+    for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset"):
+        reset = parse_duration(headers.get(name))
+        if reset is not None:
+            return reset
+    return None
+
+class RateLimiter:
+    def __init__(self):
+        self.buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self.rotation: Dict[str, int] = {}
+
+    def _settings(self, provider_name: str) -> Dict[str, Any]:
+        limits = config.RATE_LIMIT_SETTINGS
+        settings = dict(limits.get("default", {}))
+        settings.update(limits.get("providers", {}).get(provider_name, {}))
+        return settings
+
+    def _bucket(self, provider_name: str, api_key: str) -> TokenBucket:
+        bucket_key = (provider_name, api_key)
+        bucket = self.buckets.get(bucket_key)
+        if bucket is None:
+            settings = self._settings(provider_name)
+            bucket = TokenBucket(
+                settings.get("requests_per_minute", DEFAULT_REQUESTS_PER_MINUTE),
+                settings.get("burst", DEFAULT_BURST),
+            )
+            self.buckets[bucket_key] = bucket
+        return bucket
+
+    def _ordered_keys(self, provider_name: str, keys: List[str]) -> List[str]:
+        if not keys:
+            return []
+        start = self.rotation.get(provider_name, 0) % len(keys)
+        self.rotation[provider_name] = (start + 1) % len(keys)
+        return keys[start:] + keys[:start]
+
+    def choose_key(self, provider_name: str, keys: List[str]) -> Optional[str]:
+        if not keys:
+            return None
+        best_key = None
+        best_headroom = 0.0
+        for key in self._ordered_keys(provider_name, keys):
+            headroom = self._bucket(provider_name, key).headroom()
+            if headroom >= 1.0 and headroom > best_headroom:
+                best_key, best_headroom = key, headroom
+        return best_key
+
+    async def acquire(self, provider_name: str, keys: List[str], max_wait: Optional[float] = None) -> str:
+        if not keys:
+            raise ValueError(f"No API keys configured for {provider_name}")
+        if not config.RATE_LIMIT_SETTINGS.get("enabled", True):
+            return self._ordered_keys(provider_name, keys)[0]
+        if max_wait is None:
+            max_wait = config.RATE_LIMIT_SETTINGS.get("max_wait", DEFAULT_MAX_WAIT)
+        deadline = time.monotonic() + max_wait
+        while True:
+            key = self.choose_key(provider_name, keys)
+            if key is not None and self._bucket(provider_name, key).take():
+                return key
+            wait = min(self._bucket(provider_name, k).wait_time() for k in keys)
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(f"Rate limit reached for {provider_name}, retry in {wait:.1f}s", wait)
+            await asyncio.sleep(max(wait, 0.05))
+
+    def update_from_headers(self, provider_name: str, api_key: str, headers: Mapping[str, str]):
+        bucket = self._bucket(provider_name, api_key)
+        remaining = headers.get("x-ratelimit-remaining-requests") or headers.get("x-ratelimit-remaining")
+        if remaining is None:
+            return
+        try:
+            bucket.remote_remaining = int(float(remaining))
+        except ValueError:
+            return
+        reset = parse_duration(headers.get("x-ratelimit-reset-requests") or headers.get("x-ratelimit-reset"))
+        bucket.remote_reset_at = time.monotonic() + (reset if reset is not None else 60.0)
+
+    def penalize(self, provider_name: str, api_key: str, headers: Optional[Mapping[str, str]] = None) -> float:
+        retry_after = get_retry_after(headers) if headers is not None else None
+        if retry_after is None:
+            retry_after = self._settings(provider_name).get("cooldown", DEFAULT_COOLDOWN)
+        self._bucket(provider_name, api_key).cool_down(retry_after)
+        logger.info(f"Rate limited on {provider_name} key ...{api_key[-4:]}, cooling down {retry_after:.1f}s")
+        return retry_after
+
+    def soonest_available(self, provider_name: str, keys: List[str]) -> float:
+        if not keys:
+            return 0.0
+        return min(self._bucket(provider_name, k).wait_time() for k in keys)
+
+rate_limiter = RateLimiter()
@@ -1,17 +1,27 @@
 import re
 import asyncio
+import logging
 from datetime import datetime, timedelta
-from typing import Optional, Callable, Awaitable
+from typing import Dict, Any, Optional, Callable, Awaitable
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.date import DateTrigger
-from src import config, db
+from apscheduler.triggers.interval import IntervalTrigger
+from src import config, db, chat_queue
+
+logger = logging.getLogger(__name__)
 
 scheduler = AsyncIOScheduler(executor='asyncio')
 
+maintenance_stats: Dict[str, Any] = {"runs": 0, "purged": 0, "last_run": None, "last_purged": {}}
+
 ReminderCallback = Callable[[int, str], Awaitable[None]]
 
 send_reminder: Optional[ReminderCallback] = None
 
+DEFAULT_REMINDER_ATTEMPTS = 5
+DEFAULT_REMINDER_RETRY_DELAY = 60.0
+DEFAULT_REMINDER_MAX_RETRY_DELAY = 1800.0
+
 def set_reminder_callback(callback: ReminderCallback):
     global send_reminder
     send_reminder = callback
@@ -63,12 +73,36 @@ async def schedule_reminder(chat_id: int, message: str, remind_at: datetime) ->
     )
     return reminder_id
 
-async def fire_reminder(reminder_id: int, chat_id: int, message: str):
+def _reminder_settings() -> Dict[str, Any]:
+    return config.BOT_CONFIG.get("reminders", {})
+
+def _retry_reminder(reminder_id: int, chat_id: int, message: str, attempt: int) -> bool:
+    settings = _reminder_settings()
+    if attempt >= settings.get("max_attempts", DEFAULT_REMINDER_ATTEMPTS):
+        return False
+    delay = min(
+        settings.get("retry_delay", DEFAULT_REMINDER_RETRY_DELAY) * 2 ** (attempt - 1),
+        settings.get("max_retry_delay", DEFAULT_REMINDER_MAX_RETRY_DELAY),
+    )
+    scheduler.add_job(
+        fire_reminder,
+        DateTrigger(run_date=datetime.now() + timedelta(seconds=delay)),
+        args=[reminder_id, chat_id, message, attempt],
+        id=f"reminder_{reminder_id}",
+        replace_existing=True
+    )
+    logger.warning(f"Reminder {reminder_id} not delivered, retry {attempt} in {delay:.0f}s")
+    return True
+
+async def fire_reminder(reminder_id: int, chat_id: int, message: str, attempt: int = 0):
     if send_reminder:
         try:
             await send_reminder(chat_id, message)
         except Exception as e:
-            print(f"Error sending reminder: {e}")
+            print(f"Error sending reminder {reminder_id}: {e}")
+            if not _retry_reminder(reminder_id, chat_id, message, attempt + 1):
+                logger.error(f"Giving up on reminder {reminder_id} after {attempt + 1} attempts")
+            return
     try:
         await db.delete_reminder(reminder_id)
     except Exception as e:
@@ -99,10 +133,67 @@ async def load_pending_reminders():
     except Exception as e:
         print(f"Error loading pending reminders: {e}")
 
+def add_interval_job(func: Callable[[], Awaitable[None]], seconds: float, job_id: str):
+    scheduler.add_job(
+        func,
+        IntervalTrigger(seconds=seconds),
+        id=job_id,
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+
+def _maintenance_settings() -> Dict[str, Any]:
+    return config.BOT_CONFIG.get("maintenance", {})
+
+async def _wait_for_idle():
+    idle_wait = _maintenance_settings().get("idle_wait", 30.0)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + idle_wait
+    while chat_queue.active_chats() and loop.time() < deadline:
+        await asyncio.sleep(0.5)
+
+async def _purge_in_batches(purge: Callable[[int], Awaitable[int]]) -> int:
+    batch_size = _maintenance_settings().get("batch_size", 500)
+    total = 0
+    for _ in range(_maintenance_settings().get("max_batches", 20)):
+        await _wait_for_idle()
+        deleted = await purge(batch_size)
+        total += deleted
+        if deleted < batch_size:
+            break
+        await asyncio.sleep(_maintenance_settings().get("batch_pause", 0.1))
+    return total
+
+async def run_maintenance():
+    now = datetime.now()
+    log_cutoff = now - timedelta(days=_maintenance_settings().get("command_log_days", 30))
+    reminder_cutoff = now - timedelta(days=_maintenance_settings().get("reminder_days", 7))
+    purged = {"command_logs": 0, "llm_cache": 0, "reminders": 0}
+    try:
+        for chat_id in await db.get_command_log_chats():
+            purged["command_logs"] += await _purge_in_batches(
+                lambda limit, chat_id=chat_id: db.purge_command_logs(chat_id, log_cutoff, limit)
+            )
+        purged["llm_cache"] = await _purge_in_batches(db.purge_expired_cache)
+        purged["reminders"] = await _purge_in_batches(lambda limit: db.purge_stale_reminders(reminder_cutoff, limit))
+    except Exception as e:
+        logger.error(f"Maintenance run failed: {e}")
+    maintenance_stats["runs"] += 1
+    maintenance_stats["purged"] += sum(purged.values())
+    maintenance_stats["last_run"] = now
+    maintenance_stats["last_purged"] = purged
+    logger.info("Maintenance purged " + ", ".join(f"{count} {table}" for table, count in purged.items()))
+
+def get_maintenance_stats() -> Dict[str, Any]:
+    return dict(maintenance_stats)
+
 async def init_scheduler():
     if not scheduler.running:
         scheduler.start()
     await load_pending_reminders()
+    if _maintenance_settings().get("enabled", True):
+        add_interval_job(run_maintenance, _maintenance_settings().get("interval", 3600), "maintenance")
 
 async def shutdown_scheduler():
     if scheduler.running:
@@ -1,52 +1,62 @@
 import asyncio
+from typing import Dict, Any, List
 from ddgs import DDGS
 from src import llm, browser
 
+MAX_PAGE_CHARS = 3000
+
+async def search_raw(query: str, max_results: int = 3) -> List[Dict[str, Any]]:
+    ddgs = DDGS()
+    results = await asyncio.to_thread(ddgs.text, query, max_results=max_results)
+    return [
+        {
+            "title": r.get("title", "No title"),
+            "url": r.get("href", ""),
+            "snippet": r.get("body", ""),
+            "content": None,
+        }
+        for r in results or []
+    ]
+
+async def retrieve(query: str, max_results: int = 3, fetch_pages: int = 0) -> List[Dict[str, Any]]:
+    results = await search_raw(query, max_results=max_results)
+    targets = [r for r in results if r["url"]][:fetch_pages]
+    if targets:
+        pages = await asyncio.gather(
+            *(browser.fetch_page_text(r["url"], MAX_PAGE_CHARS) for r in targets),
+            return_exceptions=True
+        )
+        for result, page in zip(targets, pages):
+            if isinstance(page, str) and page:
+                result["content"] = page
+    return results
+
+def format_results(results: List[Dict[str, Any]], include_content: bool = True) -> str:
+    formatted_results = []
+    for i, r in enumerate(results, 1):
+        entry = f"{i}. {r['title']}\n{r['snippet']}\n{r['url']}"
+        if include_content and r.get("content"):
+            entry += f"\n\nPage content:\n{r['content']}"
+        formatted_results.append(entry)
+    return "\n\n".join(formatted_results)
+
 async def search_web(query: str, max_results: int = 3, fetch_full: bool = False) -> str:
     try:
-        ddgs = DDGS()
-        results = await asyncio.to_thread(ddgs.text, query, max_results=max_results)
+        results = await retrieve(query, max_results=max_results, fetch_pages=1 if fetch_full else 0)
         
         if not results:
             return "No results found."
 
-        if fetch_full and results:
-            top_url = results[0].get("href", "")
-            if top_url:
-                full_content = await browser.browse_url(top_url)
-                
-                formatted_results = []
-                for i, r in enumerate(results, 1):
-                    title = r.get("title", "No title")
-                    href = r.get("href", "")
-                    body = r.get("body", "")
-                    formatted_results.append(f"{i}. {title}\n{body}\n{href}")
-
-                search_summary = "\n\n".join(formatted_results)
-                
-                summary_prompt = f"""Summarize these web search results with full page content for the user:
-
-Search Results:
-{search_summary}
+        search_summary = format_results(results)
 
-Full Page Content:
-{full_content[:3000]}
+        if fetch_full and any(r.get("content") for r in results):
+            summary_prompt = f"""Summarize these web search results with full page content for the user:
 
-Provide a comprehensive summary of the key findings."""
-
-                summary = await llm.summarize_with_llm(summary_prompt)
-                return summary
-
-        formatted_results = []
-        for i, r in enumerate(results, 1):
-            title = r.get("title", "No title")
-            href = r.get("href", "")
-            body = r.get("body", "")
-            formatted_results.append(f"{i}. {title}\n{body}\n{href}")
-
-        search_summary = "\n\n".join(formatted_results)
+{search_summary}
 
-        summary_prompt = f"""Summarize these web search results for the user. Be concise:
+Provide a comprehensive summary of the key findings."""
+        else:
+            summary_prompt = f"""Summarize these web search results for the user. Be concise:
 
 {search_summary}
 
@@ -1,11 +1,17 @@
 from typing import Optional, List, Dict, Any
 from src import db
 
+MAX_TRIGGER_LENGTH = 255
+
+def could_be_trigger(message: str) -> bool:
+    candidate = message.strip()
+    return 0 < len(candidate) <= MAX_TRIGGER_LENGTH and not any(c.isspace() for c in candidate)
+
 async def expand_shortcut(chat_id: int, message: str) -> Optional[str]:
-    for shortcut in await db.get_shortcuts(chat_id):
-        if message.strip() == shortcut["trigger"]:
-            return shortcut["expansion"]
-    return None
+    if not could_be_trigger(message):
+        return None
+    shortcut_map = await db.get_shortcut_map(chat_id)
+    return shortcut_map.get(message.strip())
 
 async def add_shortcut(chat_id: int, trigger: str, expansion: str) -> int:
     return await db.add_shortcut(chat_id, trigger, expansion)
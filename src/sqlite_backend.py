@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 4
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS conversation_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        chat_id INTEGER NOT NULL,
+        role TEXT NOT NULL CHECK (role IN ('user', 'assistant')),
+        content TEXT NOT NULL,
+        needs_summary BOOLEAN DEFAULT FALSE,
+        is_summary BOOLEAN DEFAULT FALSE,
+        timestamp DATETIME DEFAULT (datetime('now', 'localtime'))
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_history_chat_id_id ON conversation_history (chat_id, id)",
+    "CREATE INDEX IF NOT EXISTS idx_history_timestamp ON conversation_history (timestamp)",
+    """CREATE TABLE IF NOT EXISTS reminders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        chat_id INTEGER NOT NULL,
+        message TEXT NOT NULL,
+        remind_at DATETIME NOT NULL,
+        created_at DATETIME DEFAULT (datetime('now', 'localtime'))
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_reminders_chat_id ON reminders (chat_id)",
+    "CREATE INDEX IF NOT EXISTS idx_reminders_remind_at ON reminders (remind_at)",
+    """CREATE TABLE IF NOT EXISTS command_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        chat_id INTEGER NOT NULL,
+        command TEXT NOT NULL,
+        output TEXT,
+        input TEXT,
+        created_at DATETIME DEFAULT (datetime('now', 'localtime'))
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_command_logs_chat_id_created_at ON command_logs (chat_id, created_at)",
+    """CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        chat_id INTEGER NOT NULL UNIQUE,
+        model_override TEXT,
+        agent_override TEXT,
+        message_count INTEGER DEFAULT 0,
+        updated_at DATETIME DEFAULT (datetime('now', 'localtime'))
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS sessions_updated_at AFTER UPDATE ON sessions
+       FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at BEGIN
+           UPDATE sessions SET updated_at = datetime('now', 'localtime') WHERE id = NEW.id;
+       END""",
+    """CREATE TABLE IF NOT EXISTS notes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        chat_id INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        tags TEXT,
+        created_at DATETIME DEFAULT (datetime('now', 'localtime')),
+        embedding BLOB,
+        embedding_model TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_notes_chat_id ON notes (chat_id)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(content, tags, content='notes', content_rowid='id')",
+    """CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+           INSERT INTO notes_fts (rowid, content, tags) VALUES (NEW.id, NEW.content, NEW.tags);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+           INSERT INTO notes_fts (notes_fts, rowid, content, tags) VALUES ('delete', OLD.id, OLD.content, OLD.tags);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF content, tags ON notes BEGIN
+           INSERT INTO notes_fts (notes_fts, rowid, content, tags) VALUES ('delete', OLD.id, OLD.content, OLD.tags);
+           INSERT INTO notes_fts (rowid, content, tags) VALUES (NEW.id, NEW.content, NEW.tags);
+       END""",
+    """CREATE TABLE IF NOT EXISTS shortcuts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        chat_id INTEGER NOT NULL,
+        `trigger` TEXT NOT NULL,
+        expansion TEXT NOT NULL,
+        created_at DATETIME DEFAULT (datetime('now', 'localtime')),
+        UNIQUE (chat_id, `trigger`)
+    )""",
+    """CREATE TABLE IF NOT EXISTS llm_cache (
+        cache_key TEXT PRIMARY KEY,
+        response TEXT NOT NULL,
+        expires_at DATETIME NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_llm_cache_expires_at ON llm_cache (expires_at)",
+    """CREATE TABLE IF NOT EXISTS destroy_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        attempt_at DATETIME DEFAULT (datetime('now', 'localtime')),
+        success BOOLEAN DEFAULT FALSE
+    )""",
+]
+
+def _translate(query: str) -> str:
+    return query.replace("%s", "?")
+
+def fts_query(text: str) -> str:
+    return " OR ".join(f'"{token}"' for token in TOKEN_PATTERN.findall(text))
+
+def _connect(path: str) -> sqlite3.Connection:
+    raw = sqlite3.connect(
+        path,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        isolation_level=None,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+    )
+    raw.execute("PRAGMA journal_mode = WAL")
+    raw.execute("PRAGMA synchronous = NORMAL")
+    raw.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    raw.execute("PRAGMA temp_store = MEMORY")
+    return raw
+
+class Cursor:
+    def __init__(self, connection: "Connection", as_dict: bool):
+        self.connection = connection
+        self.as_dict = as_dict
+        self.rows: List[Any] = []
+        self.position = 0
+        self.lastrowid: Optional[int] = None
+        self.rowcount = -1
+
+    async def __aenter__(self) -> "Cursor":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.rows = []
+
+    def _store(self, cur: sqlite3.Cursor) -> int:
+        rows = cur.fetchall() if cur.description else []
+        if self.as_dict and cur.description:
+            names = [column[0] for column in cur.description]
+            rows = [dict(zip(names, row)) for row in rows]
+        self.rows = rows
+        self.position = 0
+        self.lastrowid = cur.lastrowid
+        self.rowcount = cur.rowcount
+        return self.rowcount
+
+    async def execute(self, query: str, args: Sequence[Any] = ()) -> int:
+        return await self.connection.run(lambda: self._store(self.connection.raw.execute(_translate(query), tuple(args or ()))))
+
+    async def executemany(self, query: str, args: Sequence[Sequence[Any]]) -> int:
+        return await self.connection.run(lambda: self._store(self.connection.raw.executemany(_translate(query), [tuple(a) for a in args])))
+
+    async def fetchone(self) -> Optional[Any]:
+        if self.position >= len(self.rows):
+            return None
+        row = self.rows[self.position]
+        self.position += 1
+        return row
+
+    async def fetchall(self) -> List[Any]:
+        rows = self.rows[self.position:]
+        self.position = len(self.rows)
+        return rows
+
+class Connection:
+    def __init__(self, path: str):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self.raw: Optional[sqlite3.Connection] = None
+
+    async def run(self, func):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func)
+
+    async def open(self):
+        self.raw = await self.run(lambda: _connect(self.path))
+
+    def cursor(self, cursor_class=None) -> Cursor:
+        return Cursor(self, cursor_class is not None)
+
+    async def begin(self):
+        await self.run(lambda: self.raw.execute("BEGIN IMMEDIATE"))
+
+    async def commit(self):
+        await self.run(self.raw.commit)
+
+    async def rollback(self):
+        await self.run(self.raw.rollback)
+
+    async def ping(self, reconnect: bool = True):
+        await self.run(lambda: self.raw.execute("SELECT 1"))
+
+    async def close(self):
+        if self.raw is not None:
+            await self.run(self.raw.close)
+        self.executor.shutdown(wait=False)
+
+class _Acquire:
+    def __init__(self, pool: "Pool"):
+        self.pool = pool
+        self.connection: Optional[Connection] = None
+
+    def __await__(self):
+        return self.pool.idle.get().__await__()
+
+    async def __aenter__(self) -> Connection:
+        self.connection = await self.pool.idle.get()
+        return self.connection
+
+    async def __aexit__(self, *exc_info):
+        await self.pool.release(self.connection)
+
+class Pool:
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.maxsize = 1 if path == ":memory:" else size
+        self.connections: List[Connection] = []
+        self.idle: asyncio.Queue = asyncio.Queue()
+
+    @property
+    def size(self) -> int:
+        return len(self.connections)
+
+    @property
+    def freesize(self) -> int:
+        return self.idle.qsize()
+
+    async def open(self):
+        for _ in range(self.maxsize):
+            connection = Connection(self.path)
+            await connection.open()
+            self.connections.append(connection)
+            self.idle.put_nowait(connection)
+
+    def acquire(self) -> _Acquire:
+        return _Acquire(self)
+
+    async def release(self, connection: Connection):
+        try:
+            if connection.raw.in_transaction:
+                await connection.rollback()
+        finally:
+            self.idle.put_nowait(connection)
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        for connection in self.connections:
+            await connection.close()
+        self.connections = []
+
+async def create_pool(path: str, size: int = DEFAULT_POOL_SIZE) -> Pool:
+    directory = os.path.dirname(path)
+    if directory and path != ":memory:":
+        os.makedirs(directory, exist_ok=True)
+    pool = Pool(path, size)
+    await pool.open()
+    logger.info(f"SQLite database opened at {path} ({pool.maxsize} connections, WAL)")
+    return pool
+
+async def create_tables(pool: Pool):
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            for statement in SCHEMA:
+                await cur.execute(statement)
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import logging
+from typing import List, Optional, Tuple
+from src import config, db, providers
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_THRESHOLD = 500
+SUMMARY_MODEL = "groq/llama-3.1-8b-instant"
+SUMMARY_FALLBACK = ["openrouter/mistralai/mistral-7b-instruct:free"]
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You are a conversation history summarizer. "
+    "Summarize the assistant response in 1-2 sentences capturing: "
+    "what was provided, key details, function/class names if code. "
+    "Be specific enough that a follow-up request like 'fix that code' "
+    "or 'tell me more' makes sense. "
+    "Return only the summary, no preamble."
+)
+
+BATCH_SYSTEM_PROMPT = (
+    "You are a conversation history summarizer. "
+    "You will receive several numbered assistant responses. "
+    "Summarize each one in 1-2 sentences capturing: "
+    "what was provided, key details, function/class names if code. "
+    "Be specific enough that a follow-up request like 'fix that code' "
+    "or 'tell me more' makes sense. "
+    "Return only a JSON array of summary strings, one per response, in the same order."
+)
+
+COMPACTION_SYSTEM_PROMPT = (
+    "You maintain a rolling summary of an older part of a conversation. "
+    "You will receive the current summary (if any) followed by the next messages in order. "
+    "Produce an updated summary that keeps the facts, decisions, preferences, names and open tasks "
+    "the assistant may need later, and drops small talk. "
+    "Return only the summary, no preamble."
+)
+COMPACTION_PREFIX = "[Earlier conversation summary: "
+
+queue: Optional[asyncio.Queue] = None
+workers: List[asyncio.Task] = []
+semaphore: Optional[asyncio.Semaphore] = None
+
+def _settings() -> dict:
+    return config.BOT_CONFIG.get("history_summarizer", {})
+
+def _retention_settings() -> dict:
+    return config.BOT_CONFIG.get("history_retention", {})
+
+def needs_summary(role: str, text: str) -> bool:
+    return role == "assistant" and bool(text) and len(text) > SUMMARY_THRESHOLD
+
+def is_running() -> bool:
+    return queue is not None and any(not w.done() for w in workers)
+
+def _truncate(text: str) -> str:
+    return text[:SUMMARY_THRESHOLD] + "\n[...truncated for history...]"
+
+def _format_summary(summary: Optional[str], text: str) -> str:
+    if summary and len(summary) < len(text):
+        return f"[Summary: {summary.strip()}]"
+    return _truncate(text)
+
+async def summarize_for_history(text: str) -> str:
+    if not text or len(text) <= SUMMARY_THRESHOLD:
+        return text
+
+    try:
+        summary_messages = [
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Summarize this assistant response:\n\n{text[:3000]}"}
+        ]
+        summary = await providers.call_with_fallback(
+            SUMMARY_MODEL,
+            summary_messages,
+            fallback=SUMMARY_FALLBACK,
+            cache=True,
+        )
+        return _format_summary(summary, text)
+    except Exception:
+        return _truncate(text)
+
+def _parse_summaries(response: str, expected: int) -> Optional[List[str]]:
+    response = response.strip()
+    if response.startswith("```"):
+        response = response.strip("`")
+        if response.startswith("json"):
+            response = response[4:]
+    try:
+        parsed = json.loads(response.strip())
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(parsed, list) or len(parsed) != expected:
+        return None
+    return [str(item) for item in parsed]
+
+async def summarize_batch(texts: List[str]) -> List[str]:
+    if len(texts) == 1:
+        return [await summarize_for_history(texts[0])]
+
+    per_item = max(500, 6000 // len(texts))
+    numbered = "\n\n".join(f"### Response {i}\n{text[:per_item]}" for i, text in enumerate(texts, 1))
+    messages = [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Summarize these {len(texts)} assistant responses:\n\n{numbered}"}
+    ]
+    try:
+        response = await providers.call_with_fallback(SUMMARY_MODEL, messages, fallback=SUMMARY_FALLBACK)
+        summaries = _parse_summaries(response, len(texts))
+    except Exception as e:
+        logger.warning(f"Batch summarization failed: {e}")
+        summaries = None
+
+    if summaries is None:
+        return [await summarize_for_history(text) for text in texts]
+    return [_format_summary(summary, text) for summary, text in zip(summaries, texts)]
+
+async def _process(batch: List[Tuple[int, str]]):
+    async with semaphore:
+        summaries = await summarize_batch([text for _, text in batch])
+    for (message_id, _), summary in zip(batch, summaries):
+        try:
+            await db.update_message_content(message_id, summary)
+        except Exception as e:
+            logger.error(f"Failed to store summary for message {message_id}: {e}")
+
+async def _worker():
+    batch_size = _settings().get("batch_size", 4)
+    batch_wait = _settings().get("batch_wait", 0.5)
+    while True:
+        batch = [await queue.get()]
+        try:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + batch_wait
+            while len(batch) < batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            await _process(batch)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Summarizer worker error: {e}")
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+def enqueue(message_id: int, text: str) -> bool:
+    if not is_running():
+        return False
+    queue.put_nowait((message_id, text))
+    return True
+
+async def start():
+    global queue, workers, semaphore
+    if not _settings().get("enabled", True) or is_running():
+        return
+    queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(_settings().get("max_concurrency", 2))
+    workers = [asyncio.create_task(_worker()) for _ in range(_settings().get("workers", 2))]
+    try:
+        for row in await db.get_unsummarized_messages():
+            enqueue(row["id"], row["content"])
+    except Exception as e:
+        logger.warning(f"Could not load pending summaries: {e}")
+
+async def stop():
+    global queue, workers
+    if queue is None:
+        return
+    timeout = _settings().get("drain_timeout", 20.0)
+    try:
+        await asyncio.wait_for(queue.join(), timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Summarizer drain timed out with {queue.qsize()} pending; they will resume on next start")
+    for w in workers:
+        w.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    workers = []
+    queue = None
+
+async def summarize_compacted(previous: Optional[str], rows: List[dict]) -> Optional[str]:
+    max_chars = _retention_settings().get("max_summary_chars", 2000)
+    per_item = max(200, 12000 // len(rows))
+    transcript = "\n".join(f"{row['role']}: {row['content'][:per_item]}" for row in rows)
+    if previous:
+        previous = previous.removeprefix(COMPACTION_PREFIX).removesuffix("]")
+        transcript = f"Current summary:\n{previous}\n\nNext messages:\n{transcript}"
+    messages = [
+        {"role": "system", "content": COMPACTION_SYSTEM_PROMPT},
+        {"role": "user", "content": transcript}
+    ]
+    try:
+        summary = await providers.call_with_fallback(SUMMARY_MODEL, messages, fallback=SUMMARY_FALLBACK)
+    except Exception as e:
+        logger.warning(f"History compaction summary failed: {e}")
+        return None
+    if not summary or not summary.strip():
+        return None
+    return f"{COMPACTION_PREFIX}{summary.strip()[:max_chars]}]"
+
+async def compact_chat(chat_id: int) -> int:
+    keep = _retention_settings().get("keep_messages", 200)
+    batch_size = _retention_settings().get("batch_size", 100)
+    removed = 0
+    for _ in range(_retention_settings().get("max_batches", 5)):
+        rows = await db.get_compactable_messages(chat_id, keep, batch_size)
+        previous = rows[0] if rows and rows[0]["is_summary"] else None
+        raw = [row for row in rows if not row["is_summary"]][:batch_size]
+        if not raw:
+            break
+        summary = await summarize_compacted(previous["content"] if previous else None, raw)
+        if summary is None:
+            break
+        summary_id = previous["id"] if previous else raw[0]["id"]
+        deleted = [row["id"] for row in raw if row["id"] != summary_id]
+        await db.compact_messages(chat_id, summary_id, summary, deleted)
+        removed += len(deleted)
+    return removed
+
+async def compact_history():
+    if not _retention_settings().get("enabled", True):
+        return
+    threshold = _retention_settings().get("keep_messages", 200) + _retention_settings().get("batch_size", 100)
+    try:
+        chat_ids = await db.get_chats_over_history_limit(threshold)
+    except Exception as e:
+        logger.error(f"History compaction could not list chats: {e}")
+        return
+    for chat_id in chat_ids:
+        try:
+            removed = await compact_chat(chat_id)
+            if removed:
+                logger.info(f"Compacted {removed} history rows for chat {chat_id}")
+        except Exception as e:
+            logger.error(f"History compaction failed for chat {chat_id}: {e}")
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from typing import Dict, Any, Optional, List, Tuple
+from src import db
+
+logger = logging.getLogger(__name__)
+
+class TurnContext:
+    def __init__(self, chat_id: int, session: Dict[str, Any], history: List[Dict[str, Any]]):
+        self.chat_id = chat_id
+        self.session = session
+        self.history = history
+        self.pending_messages: List[Tuple[str, str]] = []
+        self.pending_logs: List[Tuple[str, str, Optional[str]]] = []
+
+    @classmethod
+    async def load(cls, chat_id: int) -> "TurnContext":
+        session, history = await asyncio.gather(db.get_session(chat_id), db.get_conversation_history(chat_id))
+        return cls(chat_id, session, list(history))
+
+    def add_message(self, role: str, content: str):
+        self.pending_messages.append((role, content))
+
+    def add_exchange(self, user_message: str, assistant_message: str):
+        self.add_message("user", user_message)
+        self.add_message("assistant", assistant_message)
+
+    def log_command(self, command: str, output: str, input_text: Optional[str] = None):
+        self.pending_logs.append((command, output, input_text))
+
+    def discard(self):
+        self.pending_messages = []
+        self.pending_logs = []
+
+    async def flush(self):
+        messages, self.pending_messages = self.pending_messages, []
+        logs, self.pending_logs = self.pending_logs, []
+        try:
+            await db.write_turn(self.chat_id, messages, logs)
+        except Exception as e:
+            logger.error(f"Failed to flush turn writes for chat {self.chat_id}: {e}")
+
+async def get_session(chat_id: int, turn: Optional[TurnContext] = None) -> Dict[str, Any]:
+    if turn is not None:
+        return turn.session
+    return await db.get_session(chat_id)
+
+async def get_history(chat_id: int, turn: Optional[TurnContext] = None) -> List[Dict[str, Any]]:
+    if turn is not None:
+        return turn.history
+    return await db.get_conversation_history(chat_id)
+
+async def save_exchange(chat_id: int, user_message: str, assistant_message: str, turn: Optional[TurnContext] = None):
+    if turn is not None:
+        turn.add_exchange(user_message, assistant_message)
+        return
+    await db.add_exchange(chat_id, user_message, assistant_message)
+
+async def log_command(chat_id: int, command: str, output: str, input_text: Optional[str] = None, turn: Optional[TurnContext] = None):
+    if turn is not None:
+        turn.log_command(command, output, input_text)
+        return
+    await db.log_command(chat_id, command, output, input_text)
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+from src import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+DEFAULT_MAX_QUEUE = 200
+DEFAULT_DEDUP_SIZE = 2000
+
+queue: Optional[asyncio.Queue] = None
+workers: List[asyncio.Task] = []
+application = None
+accepting = False
+seen_update_ids: "OrderedDict[int, None]" = OrderedDict()
+stats: Dict[str, int] = {"accepted": 0, "duplicates": 0, "rejected": 0, "processed": 0, "failed": 0}
+
+def _settings() -> Dict[str, Any]:
+    return config.BOT_CONFIG.get("update_queue", {})
+
+def is_running() -> bool:
+    return queue is not None and any(not w.done() for w in workers)
+
+def depth() -> int:
+    return queue.qsize() if queue is not None else 0
+
+def _remember(update_id: int) -> bool:
+    if update_id in seen_update_ids:
+        seen_update_ids.move_to_end(update_id)
+        return False
+    seen_update_ids[update_id] = None
+    while len(seen_update_ids) > _settings().get("dedup_size", DEFAULT_DEDUP_SIZE):
+        seen_update_ids.popitem(last=False)
+    return True
+
+def submit(update) -> bool:
+    if not accepting or not is_running():
+        return False
+    if update.update_id in seen_update_ids:
+        stats["duplicates"] += 1
+        logger.info(f"Dropping redelivered update {update.update_id}")
+        return True
+    try:
+        queue.put_nowait(update)
+    except asyncio.QueueFull:
+        stats["rejected"] += 1
+        logger.warning(f"Update queue full ({queue.qsize()}), rejecting update {update.update_id}")
+        return False
+    _remember(update.update_id)
+    stats["accepted"] += 1
+    return True
+
+async def _worker():
+    while True:
+        update = await queue.get()
+        try:
+            await application.process_update(update)
+            stats["processed"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stats["failed"] += 1
+            logger.error(f"Update {update.update_id} failed: {e}")
+        finally:
+            queue.task_done()
+
+def start(app):
+    global queue, workers, application, accepting
+    if is_running():
+        return
+    application = app
+    accepting = True
+    queue = asyncio.Queue(maxsize=_settings().get("max_queue", DEFAULT_MAX_QUEUE))
+    workers = [asyncio.create_task(_worker()) for _ in range(_settings().get("workers", DEFAULT_WORKERS))]
+    logger.info(f"Update workers started: {len(workers)}")
+
+async def stop():
+    global queue, workers, accepting
+    accepting = False
+    if queue is None:
+        return
+    timeout = _settings().get("drain_timeout", 25.0)
+    try:
+        await asyncio.wait_for(queue.join(), timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Update drain timed out with {queue.qsize()} queued")
+    for w in workers:
+        w.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    workers = []
+    queue = None
+
+def get_stats() -> Dict[str, Any]:
+    return {"depth": depth(), "workers": len(workers), **stats}
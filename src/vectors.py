@@ -0,0 +1,167 @@
+import hashlib
+import logging
+import re
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from src import config, db, providers
+
+logger = logging.getLogger(__name__)
+
+LOCAL_MODEL = "local"
+DEFAULT_DIM = 512
+DEFAULT_DTYPE = "float16"
+DEFAULT_MIN_SCORE = 0.15
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def _settings() -> Dict[str, Any]:
+    return config.BOT_CONFIG.get("notes_search", {})
+
+def enabled() -> bool:
+    return _settings().get("vector_index", True)
+
+def model_name() -> str:
+    model = _settings().get("embedding_model", LOCAL_MODEL)
+    if model == LOCAL_MODEL:
+        model = f"{LOCAL_MODEL}-{_settings().get('dim', DEFAULT_DIM)}"
+    return f"{model}:{_settings().get('storage_dtype', DEFAULT_DTYPE)}"
+
+def _features(text: str) -> List[Tuple[str, float]]:
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    features = [(token, 1.0) for token in tokens]
+    features += [(f"{a} {b}", 0.5) for a, b in zip(tokens, tokens[1:])]
+    for token in tokens:
+        padded = f"<{token}>"
+        features += [(padded[i:i + 3], 0.5) for i in range(len(padded) - 2)]
+    return features
+
+def hash_embed(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in _features(text):
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        vector[h % dim] += weight if h >> 63 else -weight
+    return _normalize(vector)
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else vector
+
+def note_text(content: str, tags: Optional[str] = None) -> str:
+    return f"{content}\n{tags}" if tags else content
+
+async def embed(texts: List[str]) -> np.ndarray:
+    model = _settings().get("embedding_model", LOCAL_MODEL)
+    if model == LOCAL_MODEL:
+        return np.vstack([hash_embed(t, _settings().get("dim", DEFAULT_DIM)) for t in texts])
+    vectors = np.asarray(await providers.embed_texts(model, texts), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+def to_blob(vector: np.ndarray) -> bytes:
+    return vector.astype(_settings().get("storage_dtype", DEFAULT_DTYPE)).tobytes()
+
+def from_blob(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=_settings().get("storage_dtype", DEFAULT_DTYPE)).astype(np.float32)
+
+class ChatIndex:
+    def __init__(self, dim: int):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.matrix = np.empty((0, dim), dtype=np.float32)
+        self.contents: Dict[int, str] = {}
+
+    def add(self, note_id: int, vector: np.ndarray, content: str):
+        if note_id in self.contents:
+            self.remove(note_id)
+        self.ids = np.append(self.ids, note_id)
+        if len(self.matrix):
+            self.matrix = np.vstack([self.matrix, vector[np.newaxis, :]])
+        else:
+            self.matrix = vector[np.newaxis, :].astype(np.float32)
+        self.contents[note_id] = content
+
+    def remove(self, note_id: int):
+        if note_id not in self.contents:
+            return
+        keep = self.ids != note_id
+        self.ids = self.ids[keep]
+        self.matrix = self.matrix[keep]
+        del self.contents[note_id]
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        if not len(self.ids):
+            return []
+        scores = self.matrix @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[i]), float(scores[i])) for i in top]
+
+indexes: Dict[int, ChatIndex] = {}
+
+async def _load_index(chat_id: int) -> ChatIndex:
+    model = model_name()
+    rows = await db.get_note_embeddings(chat_id)
+    vectors: Dict[int, np.ndarray] = {}
+    missing = []
+    for row in rows:
+        if row.get("embedding") and row.get("embedding_model") == model:
+            vectors[row["id"]] = from_blob(row["embedding"])
+        else:
+            missing.append(row)
+    if missing:
+        computed = await embed([note_text(r["content"], r.get("tags")) for r in missing])
+        for row, vector in zip(missing, computed):
+            vectors[row["id"]] = vector
+            await db.set_note_embedding(row["id"], to_blob(vector), model)
+        logger.info(f"Embedded {len(missing)} notes for chat {chat_id} with {model}")
+
+    dim = len(next(iter(vectors.values()))) if vectors else _settings().get("dim", DEFAULT_DIM)
+    index = ChatIndex(dim)
+    if vectors:
+        index.ids = np.fromiter(vectors.keys(), dtype=np.int64, count=len(vectors))
+        index.matrix = np.vstack(list(vectors.values()))
+        index.contents = {row["id"]: row["content"] for row in rows}
+    return index
+
+async def get_index(chat_id: int) -> ChatIndex:
+    index = indexes.get(chat_id)
+    if index is None:
+        index = await _load_index(chat_id)
+        indexes[chat_id] = index
+    return index
+
+async def index_note(chat_id: int, note_id: int, content: str, tags: Optional[str] = None):
+    if not enabled():
+        return
+    try:
+        vector = (await embed([note_text(content, tags)]))[0]
+        await db.set_note_embedding(note_id, to_blob(vector), model_name())
+    except Exception as e:
+        logger.warning(f"Could not embed note {note_id}: {e}")
+        indexes.pop(chat_id, None)
+        return
+    index = indexes.get(chat_id)
+    if index is not None:
+        index.add(note_id, vector, content)
+
+def remove_note(chat_id: int, note_id: int):
+    index = indexes.get(chat_id)
+    if index is not None:
+        index.remove(note_id)
+
+def clear():
+    indexes.clear()
+
+async def search(chat_id: int, query: str, k: int) -> List[Dict[str, Any]]:
+    if not enabled():
+        return []
+    index = await get_index(chat_id)
+    if not len(index.ids):
+        return []
+    query_vector = (await embed([query]))[0]
+    min_score = _settings().get("min_score", DEFAULT_MIN_SCORE)
+    return [
+        {"id": note_id, "content": index.contents.get(note_id, ""), "score": score}
+        for note_id, score in index.search(query_vector, k)
+        if score >= min_score
+    ]